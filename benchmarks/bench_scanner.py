@@ -0,0 +1,223 @@
+"""Benchmark the hot paths of ProjectManager on synthetic project trees
+
+The plugin is run outside of Sublime Text thanks to the stubs in `stubs/`.
+A projects directory is generated in a temporary folder according to the
+parameters, then the following operations are timed:
+- refresh_projects, both from scratch and when nothing changed
+- display_projects (the project quick panel)
+- display_workspaces (the workspace quick panel), both the first time and once
+  the workspaces are cached
+- reading the project key of a workspace, as done to check which project it
+  belongs to
+- update_recent
+
+Results are printed (or written to `--output`) as JSON.
+
+Example:
+    python3 benchmarks/bench_scanner.py --projects 500 --workspaces 5 --repeat 10
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs'))
+
+import sublime  # noqa: E402
+
+
+def load_plugin(packages_path, settings):
+    """Import ProjectManager as a package named `ProjectManager`, as in Sublime"""
+    sublime.set_packages_path(packages_path)
+    pm_settings = sublime.load_settings('project_manager.sublime-settings')
+    with open(os.path.join(ROOT, 'project_manager.sublime-settings'), encoding='utf-8') as f:
+        pm_settings.update(sublime.decode_value(f.read()))
+    pm_settings.update(settings)
+
+    package = types.ModuleType('ProjectManager')
+    package.__path__ = [ROOT]
+    sys.modules['ProjectManager'] = package
+    plugin = importlib.import_module('ProjectManager.project_manager')
+    plugin.plugin_loaded()
+    return plugin
+
+
+def generate_projects(root, args):
+    """Generate a projects directory in `root`
+
+    Returns:
+        list[str]: the names of the projects
+    """
+    rng = random.Random(args.seed)
+    projects_dir = os.path.join(root, 'Packages', 'User', 'Projects')
+    folders_dir = os.path.join(root, 'folders')
+    library_dir = os.path.join(root, 'library')
+    os.makedirs(projects_dir)
+
+    contents = ''.join(rng.choice('abcdefghij \n\t"\\{}[]') for _ in range(args.workspace_size))
+    # Undo history, as Sublime Text saves it: many small tokens
+    undo_stack = [
+        [i, 1, 'insert', {'characters': rng.choice('abc\n')},
+         'AQAAAAAAAAAAAAAAAQAAAAAAAAABAAAAAAAAAAAAAAAAAAAAAAAAAAAAAADwvw',
+         [[i, i + 1]]]
+        for i in range(args.undo_entries)
+    ]
+
+    def write_project(pdir, pname):
+        os.makedirs(pdir, exist_ok=True)
+        folder = os.path.join(folders_dir, pname)
+        os.makedirs(folder, exist_ok=True)
+        pfile = os.path.join(pdir, pname + '.sublime-project')
+        with open(pfile, 'w') as f:
+            json.dump({'folders': [{'path': folder}]}, f, indent='\t')
+
+        for i in range(args.workspaces):
+            wname = pname if i == 0 else 'Workspace_%d' % i
+            workspace = {
+                'buffers': [
+                    {'contents': contents, 'file': os.path.join(folder, 'file_%d.py' % j),
+                     'settings': {'buffer_size': len(contents), 'line_ending': 'Unix'},
+                     'undo_stack': undo_stack}
+                    for j in range(args.buffers)
+                ],
+                'groups': [{'sheets': [{'buffer': j, 'settings': {'selection': [[0, 0]]}}
+                                       for j in range(args.buffers)]}],
+                'project': pname + '.sublime-project',
+                'select_file': {'height': 0.0, 'last_filter': '', 'selected_items': []},
+            }
+            with open(os.path.join(pdir, wname + '.sublime-workspace'), 'w') as f:
+                json.dump(workspace, f, indent='\t')
+        return pfile
+
+    pnames = []
+    for i in range(args.projects):
+        pname = 'project_%d' % i
+        group = []
+        if args.groups:
+            group = ['group_%d' % (i % args.groups)]
+            group += ['sub_%d' % d for d in range(args.depth - 1)]
+        write_project(os.path.join(projects_dir, *(group + [pname])), pname)
+        pnames.append(pname)
+
+    library = []
+    for i in range(args.library):
+        pname = 'library_%d' % i
+        library.append(write_project(os.path.join(library_dir, pname), pname))
+        pnames.append(pname)
+    if library:
+        with open(os.path.join(projects_dir, 'library.json'), 'w') as f:
+            json.dump(sorted(library), f, indent='\t')
+
+    return pnames
+
+
+def measure(func, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'runs': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'max': max(timings),
+    }
+
+
+def run(args):
+    root = tempfile.mkdtemp(prefix='pm_bench_')
+    try:
+        pnames = generate_projects(root, args)
+        plugin = load_plugin(os.path.join(root, 'Packages'), {
+            'watch_projects': False,
+            'scan_workers': args.workers,
+        })
+        projects_info = plugin.ProjectsInfo.get_instance()
+        manager = plugin.Manager(sublime.active_window())
+        rng = random.Random(args.seed)
+
+        results = {}
+        results['refresh_projects (full)'] = measure(
+            lambda: projects_info.refresh_projects(full=True), args.repeat)
+        results['refresh_projects (unchanged)'] = measure(
+            projects_info.refresh_projects, args.repeat)
+        results['display_projects'] = measure(manager.display_projects, args.repeat)
+
+        def clear_workspaces_cache():
+            projects_info._buffers_cache.clear()
+
+        results['display_workspaces (first)'] = measure(
+            lambda: manager.display_workspaces(rng.choice(pnames)), args.repeat,
+            setup=clear_workspaces_cache)
+        results['display_workspaces (cached)'] = measure(
+            lambda: manager.display_workspaces(pnames[0]), args.repeat)
+        results['update_recent'] = measure(
+            lambda: manager.update_recent(rng.choice(pnames)), args.repeat)
+
+        wfiles = [wfile for pinfo in projects_info.info.values()
+                  for wfile in pinfo['workspaces']]
+        results['load_key project'] = measure(
+            lambda: plugin.JsonFile(rng.choice(wfiles)).load_key('project'), args.repeat,
+            setup=lambda: plugin.configure_load_cache(0))
+
+        return {
+            'parameters': vars(args),
+            'nb_projects_found': len(projects_info.info),
+            'results': results,
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--projects', type=int, default=200,
+                        help='number of projects in the projects directory')
+    parser.add_argument('--groups', type=int, default=10,
+                        help='number of groups the projects are spread over (0 for none)')
+    parser.add_argument('--depth', type=int, default=1,
+                        help='number of nested directories of each group')
+    parser.add_argument('--workspaces', type=int, default=3,
+                        help='number of workspaces per project')
+    parser.add_argument('--buffers', type=int, default=5,
+                        help='number of buffers per workspace')
+    parser.add_argument('--workspace-size', type=int, default=20000,
+                        help='number of characters of unsaved content per buffer')
+    parser.add_argument('--undo-entries', type=int, default=0,
+                        help='number of entries of the undo history of each buffer, '
+                             'to generate token-dense workspaces')
+    parser.add_argument('--library', type=int, default=20,
+                        help='number of projects listed in library.json')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='value of the `scan_workers` setting')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs of each operation')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file in which to write the results')
+    args = parser.parse_args()
+
+    results = json.dumps(run(args), indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(results + '\n')
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
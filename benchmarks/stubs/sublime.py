@@ -0,0 +1,174 @@
+"""Minimal stand-in for the `sublime` module, so that ProjectManager can be run
+outside of Sublime Text by the benchmarks.
+
+Only what ProjectManager uses is implemented. Timeouts run their callback
+immediately and there is no window.
+"""
+
+import json
+import os
+import re
+
+
+_packages_path = None
+_settings = {}
+
+
+def set_packages_path(path):
+    global _packages_path
+    _packages_path = path
+
+
+class Settings:
+    def __init__(self, values=None):
+        self._values = dict(values or {})
+        self._callbacks = {}
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def set(self, key, value):
+        self._values[key] = value
+        for callback in list(self._callbacks.values()):
+            callback()
+
+    def has(self, key):
+        return key in self._values
+
+    def erase(self, key):
+        self._values.pop(key, None)
+
+    def update(self, values):
+        self._values.update(values)
+
+    def add_on_change(self, tag, callback):
+        self._callbacks[tag] = callback
+
+    def clear_on_change(self, tag):
+        self._callbacks.pop(tag, None)
+
+
+def load_settings(name):
+    if name not in _settings:
+        _settings[name] = Settings()
+    return _settings[name]
+
+
+def save_settings(name):
+    pass
+
+
+def packages_path():
+    return _packages_path
+
+
+def cache_path():
+    return os.path.join(os.path.dirname(_packages_path), 'Cache')
+
+
+def executable_path():
+    return 'subl'
+
+
+def platform():
+    return 'linux'
+
+
+def version():
+    return '4200'
+
+
+_COMMENT_RE = re.compile(r'("(?:[^"\\]|\\.)*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+
+
+def decode_value(content):
+    """Decode JSON allowing comments and trailing commas, as Sublime Text does"""
+    content = _COMMENT_RE.sub(lambda m: m.group(1) or '', content)
+    content = _TRAILING_COMMA_RE.sub(r'\1', content)
+    return json.loads(content)
+
+
+def encode_value(value, pretty=False):
+    if pretty:
+        return json.dumps(value, indent='\t')
+    return json.dumps(value, separators=(',', ':'))
+
+
+def command_url(cmd, args=None):
+    return 'subl:%s %s' % (cmd, json.dumps(args or {}))
+
+
+class QuickPanelItem:
+    def __init__(self, trigger, details='', annotation='', kind=None):
+        self.trigger = trigger
+        self.details = details
+        self.annotation = annotation
+        self.kind = kind
+
+
+class Window:
+    def __init__(self, id=0):
+        self._id = id
+
+    def id(self):
+        return self._id
+
+    def project_file_name(self):
+        return None
+
+    def workspace_file_name(self):
+        return None
+
+    def project_data(self):
+        return None
+
+    def folders(self):
+        return []
+
+    def sheets(self):
+        return []
+
+    def views(self):
+        return []
+
+    def active_view(self):
+        return None
+
+    def run_command(self, cmd, args=None):
+        pass
+
+
+_window = Window()
+
+
+def active_window():
+    return _window
+
+
+def windows():
+    return []
+
+
+def run_command(cmd, args=None):
+    pass
+
+
+def set_timeout(callback, delay=0):
+    callback()
+
+
+def set_timeout_async(callback, delay=0):
+    callback()
+
+
+def status_message(msg):
+    pass
+
+
+def message_dialog(msg):
+    pass
+
+
+def ok_cancel_dialog(msg, ok_title=''):
+    return True
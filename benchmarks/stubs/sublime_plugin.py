@@ -0,0 +1,27 @@
+"""Minimal stand-in for the `sublime_plugin` module, see `sublime.py`"""
+
+
+class EventListener:
+    pass
+
+
+class ViewEventListener:
+    pass
+
+
+class WindowCommand:
+    def __init__(self, window):
+        self.window = window
+
+
+class TextCommand:
+    def __init__(self, view):
+        self.view = view
+
+
+def on_activated(view_id):
+    pass
+
+
+def on_activated_async(view_id):
+    pass
@@ -0,0 +1,82 @@
+import sublime
+
+import threading
+
+from .json_file import JsonFile
+from .utils import file_signature
+
+
+class DescriptionsStore:
+    """Keep the content of `descriptions.json` in memory
+
+    The file maps project and workspace files to their description. It's read
+    again by `reload_if_changed` only if it was modified by something else than
+    this store. Modifications are written back in a single save, `flush_delay`
+    milliseconds after the first of them.
+    """
+
+    def __init__(self, fpath, flush_delay=1000):
+        self.fpath = fpath
+        self.flush_delay = flush_delay
+
+        self._descriptions = None
+        self._signature = None
+        self._dirty = False
+        self._flush_scheduled = False
+        self._lock = threading.RLock()
+
+    def reload_if_changed(self):
+        """Read the file again if it changed on disk since it was last read or
+        written, and if there is no pending modification"""
+        with self._lock:
+            if self._descriptions is None or self._dirty:
+                return
+            if file_signature(self.fpath) != self._signature:
+                self._descriptions = None
+
+    def _data(self):
+        if self._descriptions is None:
+            self._signature = file_signature(self.fpath)
+            self._descriptions = {}
+            if self._signature is not None:
+                self._descriptions = JsonFile(self.fpath).load({})
+        return self._descriptions
+
+    def __contains__(self, file):
+        with self._lock:
+            return file in self._data()
+
+    def __getitem__(self, file):
+        with self._lock:
+            return self._data()[file]
+
+    def get(self, file, default=None):
+        with self._lock:
+            return self._data().get(file, default)
+
+    def __setitem__(self, file, description):
+        with self._lock:
+            self._data()[file] = description
+            self._mark_dirty()
+
+    def __delitem__(self, file):
+        with self._lock:
+            del self._data()[file]
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            sublime.set_timeout_async(self.flush, self.flush_delay)
+
+    def flush(self):
+        """Write the pending modifications to the file"""
+        with self._lock:
+            self._flush_scheduled = False
+            if not self._dirty:
+                return
+
+            JsonFile(self.fpath).save(self._descriptions)
+            self._signature = file_signature(self.fpath)
+            self._dirty = False
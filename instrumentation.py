@@ -0,0 +1,142 @@
+import collections
+import time
+
+from functools import wraps
+
+
+class _Timer:
+    """Context manager measuring the duration of an operation"""
+
+    __slots__ = ('profiler', 'name', 'counters', 'start')
+
+    # Whether the counters are recorded, so that computing them can be skipped
+    enabled = True
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.counters = {}
+
+    def count(self, counter, value=1):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        self.profiler.records.append((self.name, duration, self.counters))
+        return False
+
+
+class _NullTimer:
+    """Context manager used when the profiler is disabled"""
+
+    __slots__ = ()
+
+    enabled = False
+
+    def count(self, counter, value=1):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    """Record the duration of operations and some counters about them (e.g. the
+    number of bytes read) in a ring buffer
+
+    When disabled, `timed` returns a shared no-op context manager, so instrumented
+    code only pays for an attribute lookup and a method call.
+    """
+
+    def __init__(self, size=1000):
+        self.enabled = False
+        self.records = collections.deque(maxlen=size)
+
+    def configure(self, enabled, size=1000):
+        self.enabled = enabled
+        if size != self.records.maxlen:
+            self.records = collections.deque(self.records, maxlen=size)
+
+    def timed(self, name):
+        """Return a context manager recording the duration of the operation `name`
+
+        Counters that are costly to compute should only be computed if the timer is
+        `enabled`.
+
+        Example:
+            with profiler.timed('json.load') as timer:
+                content = f.read()
+                timer.count('bytes_read', len(content))
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def profiled(self, name):
+        """Decorator recording the duration of each call of a function"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self.records.clear()
+
+    def summary(self):
+        """Aggregate the records by operation
+
+        Returns:
+            list[dict]: for each operation, the number of calls, the total, mean and
+                maximum durations (in seconds) and the sum of each counter; sorted by
+                decreasing total duration
+        """
+        stats = collections.OrderedDict()
+        for name, duration, counters in list(self.records):
+            stat = stats.setdefault(name, {'name': name, 'calls': 0, 'total': 0.0,
+                                           'max': 0.0, 'counters': {}})
+            stat['calls'] += 1
+            stat['total'] += duration
+            stat['max'] = max(stat['max'], duration)
+            for counter, value in counters.items():
+                stat['counters'][counter] = stat['counters'].get(counter, 0) + value
+
+        for stat in stats.values():
+            stat['mean'] = stat['total'] / stat['calls']
+        return sorted(stats.values(), key=lambda stat: stat['total'], reverse=True)
+
+    def report(self):
+        """Render the summary as a text table"""
+        summary = self.summary()
+        lines = ['ProjectManager performance report ({} records)'.format(len(self.records)),
+                 '']
+        header = '{:<36} {:>7} {:>12} {:>10} {:>10}  {}'
+        lines.append(header.format('Operation', 'Calls', 'Total (ms)', 'Mean (ms)',
+                                   'Max (ms)', 'Counters'))
+        lines.append('-' * 100)
+        for stat in summary:
+            counters = ', '.join('{}={}'.format(counter, value)
+                                 for counter, value in sorted(stat['counters'].items()))
+            lines.append(header.format(stat['name'], stat['calls'],
+                                       '{:.2f}'.format(stat['total'] * 1000),
+                                       '{:.2f}'.format(stat['mean'] * 1000),
+                                       '{:.2f}'.format(stat['max'] * 1000),
+                                       counters))
+        return '\n'.join(lines) + '\n'
+
+
+profiler = Profiler()
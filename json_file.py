@@ -1,42 +1,665 @@
 import sublime
+import collections
+import json
 import os
+import pickle
+import re
+import shutil
+import threading
+
+from json.decoder import scanstring
+
+from .instrumentation import profiler
+from .utils import file_signature
+
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+_LITERAL_RE = re.compile(r'[^ \t\n\r{}\[\]:,"]+')
+_STRUCTURE_RE = re.compile(r'["{}\[\]]')
+
+# Past this number of characters, a document with more tokens than one every
+# _DENSE_CHARS characters is faster to decode as a whole with `json.loads` (e.g.
+# a workspace with a long undo history) than to scan
+_DENSE_SCAN_START = 1 << 20
+_DENSE_CHARS = 32
+
+# The full decode builds the whole document in memory, which takes several times
+# the size of the file for a dense one: past this size, dense files are scanned
+# anyway, trading speed (up to about twice as slow) for a bounded memory usage
+_DENSE_DECODE_MAX = 4 << 20
+
+# Files larger than this are read by `load_key` and `load_array_field` without the
+# cache of `load`: a hit would unpickle the whole document to read a few values,
+# and caching their full decode would evict the small files (descriptions, project
+# files...) the cache is meant for
+_PARTIAL_LOAD_CACHE_MAX = 1 << 20
+
+# Files edited by hand, which may contain comments and trailing commas
+_LENIENT_EXTENSIONS = ('.sublime-project',)
+
+# Saves waiting to be written by `flush_pending_saves`:
+# {path: (JsonFile, data, on_error)}
+_pending_saves = {}
+_pending_saves_lock = threading.Lock()
+
+
+class _LoadCache:
+    """LRU cache of the data loaded by `JsonFile.load`
+
+    Entries are validated by the signature of the file (mtime, size and inode).
+    The data is stored pickled, so that each load returns a new copy that callers
+    can modify without corrupting the cache, and so that the size of the entries
+    is known. Entries are evicted once their total size exceeds `max_bytes`.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, fpath, signature):
+        """Get the data of a file, or None if it's not in the cache"""
+        with self._lock:
+            entry = self._entries.get(fpath)
+            if entry is None or entry[0] != signature:
+                return None
+            self._entries.move_to_end(fpath)
+            blob = entry[1]
+        return pickle.loads(blob)
+
+    def put(self, fpath, signature, data):
+        # Don't pickle the data if the cache is disabled or if the file is too large
+        # to be cached (its size is the second item of its signature)
+        if self.max_bytes <= 0 or signature[1] > self.max_bytes:
+            self.invalidate(fpath)
+            return
+
+        blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remove(fpath)
+            if len(blob) > self.max_bytes:
+                return
+            self._entries[fpath] = (signature, blob)
+            self._size += len(blob)
+            self._evict()
+
+    def invalidate(self, fpath):
+        with self._lock:
+            self._remove(fpath)
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _remove(self, fpath):
+        entry = self._entries.pop(fpath, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def _evict(self):
+        while self._size > self.max_bytes:
+            _, (_, blob) = self._entries.popitem(last=False)
+            self._size -= len(blob)
+
+
+_load_cache = _LoadCache(8 << 20)
+
+
+def configure_load_cache(max_bytes):
+    """Set the maximum size of the data kept in memory by `JsonFile.load`"""
+    _load_cache.resize(max_bytes)
+
+
+def flush_pending_saves(fpath=None):
+    """Write the data passed to `JsonFile.save_later`
+
+    Args:
+        fpath: str
+            If given, only write the pending save of this path
+    """
+    with _pending_saves_lock:
+        if fpath is None:
+            saves = list(_pending_saves.values())
+            _pending_saves.clear()
+        elif fpath in _pending_saves:
+            saves = [_pending_saves.pop(fpath)]
+        else:
+            return
+
+    # A failing save (e.g. in a read-only directory) doesn't prevent the others
+    for json_file, data, on_error in saves:
+        try:
+            json_file.save(data)
+        except OSError:
+            if on_error is not None:
+                on_error()
+
+
+class _JsonScanner:
+    """Read a JSON document chunk by chunk to extract some of its values without
+    decoding (and building in memory) the whole document.
+
+    Only strict JSON is supported: a ValueError is raised when something unexpected
+    is encountered so that the caller can fall back to a full decode. If
+    `give_up_when_dense` is True, it's also raised when the document has too many
+    tokens for the scan to be faster than a full decode.
+    """
+
+    def __init__(self, f, chunk_size=65536, give_up_when_dense=False):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.give_up_when_dense = give_up_when_dense
+        # Number of strings and brackets skipped
+        self.steps = 0
+        self.buf = ''
+        self.pos = 0
+        # Number of characters of the file before the start of the buffer
+        self.offset = 0
+        self.eof = False
+        self.value = None
+
+    def _fill(self, keep=0):
+        """Read the next chunk, dropping the consumed part of the buffer except for
+        the last `keep` characters
+
+        Returns:
+            bool: False if the end of the file was already reached
+        """
+        if self.eof:
+            return False
+
+        # Read at least as much as what is pending so that a long token split over
+        # several chunks is only rescanned a logarithmic number of times
+        chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos + keep))
+        if not chunk:
+            self.eof = True
+            return True
+
+        self.offset += self.pos - keep
+        self.buf = self.buf[self.pos - keep:] + chunk
+        self.pos = keep
+        return True
+
+    def _scan_string(self):
+        """Decode the string whose opening quote was just consumed"""
+        while True:
+            try:
+                self.value, self.pos = scanstring(self.buf, self.pos)
+                return
+            except ValueError:
+                # The string is probably truncated: keep its opening quote
+                if not self._fill(keep=1):
+                    raise
+
+    def next(self):
+        """Return the next token, or None at the end of the document
+
+        Strings are returned as '"' and literals (numbers, booleans, null) as they
+        are written; in both cases, their decoded value is stored in `self.value`.
+        """
+        while True:
+            self.pos = _WHITESPACE_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                break
+            if not self._fill():
+                return None
+
+        char = self.buf[self.pos]
+        if char in '{}[]:,':
+            self.pos += 1
+            return char
+
+        if char == '"':
+            self.pos += 1
+            self._scan_string()
+            return char
+
+        while True:
+            end = _LITERAL_RE.match(self.buf, self.pos).end()
+            # A literal reaching the end of the buffer may be truncated
+            if end < len(self.buf) or self.eof:
+                break
+            self._fill()
+
+        token = self.buf[self.pos:end]
+        self.value = json.loads(token)
+        self.pos = end
+        return token
+
+    def skip_value(self):
+        """Skip the next value without decoding it"""
+        self._skip_from(self.next())
+
+    def _skip_from(self, token):
+        """Skip the value whose first token was just read"""
+        if token is None or token in ('}', ']', ':', ','):
+            raise ValueError('Invalid JSON')
+        if token not in ('{', '['):
+            return
+
+        depth = 1
+        while depth:
+            m = _STRUCTURE_RE.search(self.buf, self.pos)
+            if not m:
+                self.pos = len(self.buf)
+                if not self._fill() or self.eof:
+                    raise ValueError('Invalid JSON')
+                continue
+
+            char = m.group()
+            self.pos = m.end()
+            if char == '"':
+                self._scan_string()
+            else:
+                depth += 1 if char in '{[' else -1
+
+            self.steps += 1
+            if self.give_up_when_dense and not self.steps & 0xfff:
+                scanned = self.offset + self.pos
+                if _DENSE_SCAN_START < scanned < self.steps * _DENSE_CHARS:
+                    raise ValueError('Too many tokens to scan')
+
+    def value_span(self):
+        """Skip the next value and return its position in the file
+
+        Returns:
+            tuple[int, int]: the offsets (in characters) of the start and the end
+                of the value
+        """
+        while True:
+            self.pos = _WHITESPACE_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill() or self.eof:
+                break
+
+        start = self.offset + self.pos
+        self._skip_from(self.next())
+        return start, self.offset + self.pos
+
+    def iter_keys(self):
+        """Iterate over the keys of the object whose opening brace was just read
+
+        The value associated with each key must be consumed before moving on to the
+        next one.
+        """
+        token = self.next()
+        while token != '}':
+            if token != '"':
+                raise ValueError('Invalid JSON')
+            key = self.value
+            if self.next() != ':':
+                raise ValueError('Invalid JSON')
+            yield key
+
+            token = self.next()
+            if token == ',':
+                token = self.next()
+            elif token != '}':
+                raise ValueError('Invalid JSON')
+
+    def find_key(self, key):
+        """Move to the value of a key of the top-level object
+
+        Returns:
+            bool: whether the key was found
+        """
+        if self.next() != '{':
+            raise ValueError('Invalid JSON')
+
+        for name in self.iter_keys():
+            if name == key:
+                return True
+            self.skip_value()
+        return False
+
+    def read_array_field(self, field):
+        """Read the value of `field` in every object of the array whose opening
+        bracket was just read, skipping everything else
+
+        Returns:
+            list: the values found, in order
+        """
+        values = []
+        token = self.next()
+        while token != ']':
+            if token == '{':
+                for name in self.iter_keys():
+                    token = self.next()
+                    if name == field and token not in ('{', '['):
+                        values.append(self.value)
+                    else:
+                        self._skip_from(token)
+            else:
+                self._skip_from(token)
+
+            token = self.next()
+            if token == ',':
+                token = self.next()
+            elif token != ']':
+                raise ValueError('Invalid JSON')
+        return values
 
 
 class JsonFile:
-    def __init__(self, fpath, encoding='utf-8'):
+    """Load and save a JSON file
+
+    Files written by Sublime Text or by this package are first decoded by the
+    standard `json` module, which is much faster than `sublime.decode_value` but
+    rejects comments and trailing commas: `sublime.decode_value` is only used if
+    it fails. Files edited by hand (`.sublime-project` files) are always decoded
+    by `sublime.decode_value`.
+
+    Args:
+        fpath: str
+            The path of the file
+        encoding: str
+            The encoding of the file
+        strict: bool
+            Whether to try the standard decoder first; by default, it's tried
+            for every file except `.sublime-project` files
+        compact: bool
+            Whether to save the file without indentation nor spaces, for files
+            not meant to be read by a human
+    """
+
+    def __init__(self, fpath, encoding='utf-8', strict=None, compact=False):
         self.encoding = encoding
         self.fpath = fpath
+        if strict is None:
+            strict = not fpath.endswith(_LENIENT_EXTENSIONS)
+        self.strict = strict
+        self.compact = compact
+
+    def load(self, default=None, quiet=False, cache=True):
+        """Load the data of the file, creating it with `default` if it doesn't exist
 
-    def load(self, default=None):
+        If the file can't be decoded, a ValueError is raised, after a dialog
+        reporting it unless `quiet` is True. The data is kept in memory for the
+        next loads unless `cache` is False.
+        """
         if default is None:
             default = []
 
+        flush_pending_saves(self.fpath)
+        signature = file_signature(self.fpath)
+        if signature is not None and cache:
+            data = self._load_cached(signature)
+            if data is not None:
+                return data or default
+
         self.fdir = os.path.dirname(self.fpath)
         if not os.path.isdir(self.fdir):
             os.makedirs(self.fdir)
         if os.path.exists(self.fpath):
-            with open(self.fpath, mode='r', encoding=self.encoding) as f:
+            with profiler.timed('JsonFile.load') as timer, \
+                    open(self.fpath, mode='r', encoding=self.encoding) as f:
                 content = f.read()
+                if timer.enabled:
+                    timer.count('bytes_read', f.buffer.tell())
                 try:
-                    data = sublime.decode_value(content)
+                    data = self._decode(content, timer)
                 except Exception:
-                    sublime.message_dialog('%s is bad!' % self.fpath)
+                    if not quiet:
+                        sublime.message_dialog('%s is bad!' % self.fpath)
                     raise
+                if data is not None and signature is not None and cache:
+                    _load_cache.put(self.fpath, signature, data)
                 if not data:
                     data = default
         else:
-            with open(self.fpath, mode='w', encoding=self.encoding, newline='\n') as f:
-                data = default
-                f.write(sublime.encode_value(data, True))
+            data = default
+            self.save(data)
         return data
 
+    def _decode(self, content, timer):
+        if self.strict:
+            try:
+                return json.loads(content)
+            except ValueError:
+                timer.count('lenient_fallbacks')
+        return sublime.decode_value(content)
+
+    def _encode(self, data):
+        if self.compact:
+            return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        return sublime.encode_value(data, True)
+
+    def _load_cached(self, signature):
+        """Get the data of the file from the cache of `load`, or None"""
+        with profiler.timed('JsonFile.load_cached'):
+            return _load_cache.get(self.fpath, signature)
+
+    def load_key(self, key, default=None):
+        """Load the value of a single key of the top-level object
+
+        The file is read until the key is found, without decoding the values of the
+        other keys. If the file can't be parsed this way (e.g. it contains comments)
+        or if the value isn't a string, a number, a boolean or null, the whole file
+        is decoded instead.
+
+        Args:
+            key: str
+                The key to look for
+            default:
+                The value to return if the file or the key doesn't exist
+
+        Returns:
+            the value associated with the key
+        """
+        flush_pending_saves(self.fpath)
+        signature = file_signature(self.fpath)
+        if signature is None:
+            return default
+
+        cache = signature[1] <= _PARTIAL_LOAD_CACHE_MAX
+        data = self._load_cached(signature) if cache else None
+        if data is not None:
+            return data.get(key, default) if isinstance(data, dict) else default
+
+        try:
+            with profiler.timed('JsonFile.load_key') as timer, \
+                    open(self.fpath, mode='r', encoding=self.encoding, newline='') as f:
+                try:
+                    scanner = _JsonScanner(
+                        f, give_up_when_dense=signature[1] <= _DENSE_DECODE_MAX)
+                    if not scanner.find_key(key):
+                        return default
+                    if scanner.next() in ('{', '['):
+                        raise ValueError('Not a scalar value')
+                    return scanner.value
+                finally:
+                    if timer.enabled:
+                        timer.count('bytes_read', f.buffer.tell())
+        except ValueError:
+            data = self.load({}, cache=cache)
+            if not isinstance(data, dict):
+                return default
+            return data.get(key, default)
+
+    def load_array_field(self, key, field):
+        """Load the value of `field` in every object of the array stored under `key`
+        in the top-level object
+
+        As with `load_key`, the file is streamed and only the requested values are
+        decoded, the whole file being decoded only if it can't be parsed this way.
+
+        Args:
+            key: str
+                The key of the array in the top-level object
+            field: str
+                The key to look for in each object of the array
+
+        Returns:
+            list: the values of `field` that are strings, numbers, booleans or null
+        """
+        flush_pending_saves(self.fpath)
+        signature = file_signature(self.fpath)
+        if signature is None:
+            return []
+
+        cache = signature[1] <= _PARTIAL_LOAD_CACHE_MAX
+        data = self._load_cached(signature) if cache else None
+        if data is None:
+            try:
+                with profiler.timed('JsonFile.load_array_field') as timer, \
+                        open(self.fpath, mode='r', encoding=self.encoding, newline='') as f:
+                    try:
+                        scanner = _JsonScanner(
+                            f, give_up_when_dense=signature[1] <= _DENSE_DECODE_MAX)
+                        if not scanner.find_key(key):
+                            return []
+                        if scanner.next() != '[':
+                            raise ValueError('Not an array')
+                        return scanner.read_array_field(field)
+                    finally:
+                        if timer.enabled:
+                            timer.count('bytes_read', f.buffer.tell())
+            except ValueError:
+                data = self.load({}, cache=cache)
+
+        if not isinstance(data, dict) or not isinstance(data.get(key), list):
+            return []
+        return [item[field] for item in data[key]
+                if isinstance(item, dict) and field in item
+                and not isinstance(item[field], (dict, list))]
+
+    def replace_key(self, key, value):
+        """Replace the value of a single key of the top-level object
+
+        The file is streamed to a temporary copy in which only the old value is
+        replaced, so that the rest of the document is neither decoded nor
+        re-encoded. If the file can't be parsed this way or if the key doesn't
+        exist, the whole file is decoded and saved again instead.
+
+        Args:
+            key: str
+                The key whose value to replace
+            value:
+                The new value
+        """
+        flush_pending_saves(self.fpath)
+        try:
+            with profiler.timed('JsonFile.replace_key') as timer:
+                with open(self.fpath, mode='r', encoding=self.encoding, newline='') as f:
+                    scanner = _JsonScanner(f)
+                    if not scanner.find_key(key):
+                        raise ValueError('Key not found')
+                    start, end = scanner.value_span()
+
+                # The file is opened again so that it's closed when it's replaced,
+                # which Windows requires
+                def write(tmp):
+                    with open(self.fpath, mode='r', encoding=self.encoding,
+                              newline='') as f:
+                        self._copy(f, tmp, start)
+                        tmp.write(json.dumps(value, ensure_ascii=False))
+                        self._copy(f, tmp, end - start, write=False)
+                        self._copy(f, tmp)
+
+                self._write_atomically(write, timer, newline='')
+        except ValueError:
+            data = self.load({})
+            data[key] = value
+            self.save(data)
+
+    @staticmethod
+    def _copy(src, dst, size=None, write=True, chunk_size=1 << 20):
+        """Copy `size` characters (or everything left) from `src` to `dst`"""
+        while size is None or size > 0:
+            chunk = src.read(chunk_size if size is None else min(size, chunk_size))
+            if not chunk:
+                break
+            if write:
+                dst.write(chunk)
+            if size is not None:
+                size -= len(chunk)
+
+    def _write_atomically(self, write, timer, newline='\n'):
+        """Write the file with `write(f)`
+
+        The content is written to a hidden temporary file which then replaces the
+        file, so that a crash can't leave the file truncated. If the file is a
+        symbolic link, its target is replaced. The mode of the file is kept.
+
+        Args:
+            write: callable
+                Called with the temporary file opened in text mode
+            timer:
+                The timer of the operation, as given by `profiler.timed`
+            newline: str
+                The `newline` argument with which to open the temporary file
+        """
+        fpath = os.path.realpath(self.fpath)
+        try:
+            fd, tmp_path = self._create_temp_file(fpath)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+            fd, tmp_path = self._create_temp_file(fpath)
+
+        try:
+            with open(fd, mode='w', encoding=self.encoding, newline=newline) as f:
+                write(f)
+                if timer.enabled:
+                    timer.count('bytes_written', f.tell())
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                shutil.copymode(fpath, tmp_path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, fpath)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        finally:
+            _load_cache.invalidate(self.fpath)
+
+    @staticmethod
+    def _create_temp_file(fpath):
+        """Create a new hidden file next to `fpath`
+
+        Unlike `tempfile.mkstemp`, which restricts the file to its owner, the file
+        gets the default permissions of new files (as set by the umask).
+
+        Returns:
+            tuple[int, str]: the file descriptor and the path of the file
+        """
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+        fdir, name = os.path.split(fpath)
+        while True:
+            tmp_path = os.path.join(fdir, '.%s.%s.tmp' % (name, os.urandom(4).hex()))
+            try:
+                return os.open(tmp_path, flags, 0o666), tmp_path
+            except FileExistsError:
+                continue
+
     def save(self, data, indent=4):
-        self.fdir = os.path.dirname(self.fpath)
-        if not os.path.isdir(self.fdir):
-            os.makedirs(self.fdir)
-        with open(self.fpath, mode='w', encoding=self.encoding, newline='\n') as f:
-            f.write(sublime.encode_value(data, True))
+        """Write the data to the file, atomically (see `_write_atomically`)"""
+        with _pending_saves_lock:
+            _pending_saves.pop(self.fpath, None)
+
+        content = self._encode(data)
+        with profiler.timed('JsonFile.save') as timer:
+            self._write_atomically(lambda f: f.write(content), timer)
+
+    def save_later(self, data, delay=1000, on_error=None):
+        """Save the data in a background thread after `delay` milliseconds
+
+        Until then, saving this path again only replaces the data to write, so that
+        a burst of saves results in a single write. Loading the file writes the data
+        first. If the file can't be written, `on_error` is called instead of raising
+        the error.
+        """
+        with _pending_saves_lock:
+            scheduled = self.fpath in _pending_saves
+            _pending_saves[self.fpath] = (self, data, on_error)
+        if not scheduled:
+            sublime.set_timeout_async(lambda: flush_pending_saves(self.fpath), delay)
 
     def remove(self):
+        with _pending_saves_lock:
+            _pending_saves.pop(self.fpath, None)
+        _load_cache.invalidate(self.fpath)
         if os.path.exists(self.fpath):
             os.remove(self.fpath)
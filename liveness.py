@@ -0,0 +1,208 @@
+import collections
+import errno
+import os
+import re
+import sys
+import threading
+import time
+
+
+ALIVE = 'alive'
+MISSING = 'missing'
+UNREACHABLE = 'unreachable'
+
+# Errors meaning that a path doesn't exist, as opposed to the volume being broken
+_MISSING_ERRNOS = (errno.ENOENT, errno.ENOTDIR)
+
+
+def _stat_status(path):
+    try:
+        os.stat(path)
+    except OSError as e:
+        return MISSING if e.errno in _MISSING_ERRNOS else UNREACHABLE
+    return ALIVE
+
+
+def read_mounts(mounts_file='/proc/self/mounts'):
+    """Read the mounted file systems, on Linux
+
+    Returns:
+        list[(str, str)]: the mount points and the types of their file systems,
+            or an empty list if they can't be read
+    """
+    mounts = []
+    try:
+        with open(mounts_file, encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2:
+                    # Spaces and tabs are escaped in octal
+                    mounts.append((re.sub(r'\\([0-7]{3})',
+                                          lambda m: chr(int(m.group(1), 8)),
+                                          fields[1]),
+                                   fields[2]))
+    except OSError:
+        pass
+    return mounts
+
+
+class LivenessChecker:
+    """Check whether paths exist without ever blocking on a hung network mount
+
+    Paths are checked by `stat` calls made in daemon threads. A path whose check
+    takes more than `timeout` seconds is reported as unreachable, as well as every
+    other path on the same mount point, which isn't checked anymore. Unreachable
+    mount points and existing paths are cached per mount point for `ttl` seconds;
+    missing paths are always checked again, so that no decision to remove something
+    is based on an outdated result.
+    """
+
+    def __init__(self, timeout=2, ttl=60, workers=4):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.workers = workers
+
+        # {mount: (expiration time, unreachable, {path: status})}
+        self._cache = {}
+        self._mounts = None
+        self._mounts_expiration = 0
+        self._lock = threading.Lock()
+
+    def _mount_points(self):
+        """Get the mount points, without touching the mounted file systems"""
+        if self._mounts is None or time.monotonic() > self._mounts_expiration:
+            mounts = {'/'} | {mount for mount, _ in read_mounts()}
+            self._mounts = sorted(mounts, key=len, reverse=True)
+            self._mounts_expiration = time.monotonic() + self.ttl
+        return self._mounts
+
+    def mount_point(self, path):
+        """Get the mount point of a path, without touching the file system
+
+        On Linux, it's read from /proc/self/mounts; on Windows it's the drive or the
+        UNC share. On macOS, it's the volume in /Volumes, the host in /net or
+        /Network/Servers (mounted by autofs), and otherwise the first component of
+        the path, so that a hung network folder mounted elsewhere doesn't make every
+        path of the system volume unreachable.
+        """
+        path = os.path.abspath(path)
+        if sys.platform == 'win32':
+            return os.path.splitdrive(path)[0] or path
+        if sys.platform == 'darwin':
+            parts = path.split(os.sep)
+            if len(parts) > 3 and parts[1:3] == ['Network', 'Servers']:
+                return os.sep.join(parts[:4])
+            if len(parts) > 2 and parts[1] in ('Volumes', 'net'):
+                return os.sep.join(parts[:3])
+            return os.sep.join(parts[:2]) or os.sep
+
+        for mount in self._mount_points():
+            if path == mount or path.startswith(mount.rstrip(os.sep) + os.sep):
+                return mount
+        return os.sep
+
+    def check(self, paths):
+        """Check whether paths exist
+
+        Args:
+            paths: list[str]
+                The paths to check
+
+        Returns:
+            dict[str, str]: the status of each path, ALIVE, MISSING or UNREACHABLE
+        """
+        now = time.monotonic()
+        results = {}
+        to_check = collections.OrderedDict()
+        with self._lock:
+            for path in paths:
+                mount = self.mount_point(path)
+                expiration, unreachable, statuses = self._cache.get(mount, (0, False, {}))
+                if now > expiration:
+                    to_check[path] = mount
+                elif unreachable:
+                    results[path] = UNREACHABLE
+                elif path in statuses:
+                    results[path] = statuses[path]
+                else:
+                    to_check[path] = mount
+
+        probed, dead_mounts = self._probe(to_check)
+        results.update(probed)
+
+        now = time.monotonic()
+        with self._lock:
+            for path, mount in to_check.items():
+                expiration, unreachable, statuses = self._cache.get(mount, (0, False, {}))
+                if now > expiration:
+                    expiration, unreachable, statuses = now + self.ttl, False, {}
+                if probed[path] == ALIVE:
+                    statuses[path] = ALIVE
+                self._cache[mount] = (expiration, unreachable or mount in dead_mounts,
+                                      statuses)
+        return results
+
+    def _probe(self, paths):
+        """Stat paths in daemon threads, giving up on the mount points of the paths
+        whose stat lasts more than `timeout` seconds
+
+        Args:
+            paths: dict[str, str]
+                The mount point of each path to check
+
+        Returns:
+            tuple[dict[str, str], set[str]]: the status of each path, and the mount
+                points found to be hung
+        """
+        results = {}
+        dead_mounts = set()
+        if not paths:
+            return results, dead_mounts
+
+        queue = collections.deque(paths)
+        in_flight = {}
+        condition = threading.Condition()
+
+        def worker():
+            while True:
+                with condition:
+                    # Skip the paths on mounts found to be hung
+                    while queue and paths[queue[0]] in dead_mounts:
+                        results[queue.popleft()] = UNREACHABLE
+                    if not queue:
+                        condition.notify_all()
+                        return
+                    path = queue.popleft()
+                    in_flight[path] = time.monotonic()
+
+                status = _stat_status(path)
+
+                with condition:
+                    if in_flight.pop(path, None) is not None:
+                        results[path] = status
+                    condition.notify_all()
+
+        def start_worker():
+            thread = threading.Thread(target=worker, name='ProjectManager liveness')
+            thread.daemon = True
+            thread.start()
+
+        with condition:
+            for _ in range(min(self.workers, len(paths))):
+                start_worker()
+
+            while len(results) < len(paths):
+                now = time.monotonic()
+                for path, start in list(in_flight.items()):
+                    if now - start > self.timeout:
+                        # The thread stays stuck: replace it to check the other paths
+                        del in_flight[path]
+                        results[path] = UNREACHABLE
+                        dead_mounts.add(paths[path])
+                        start_worker()
+
+                if len(results) < len(paths):
+                    condition.wait(max(0.01, min([self.timeout] + [
+                        start + self.timeout - now for start in in_flight.values()])))
+
+        return results, dead_mounts
@@ -1,21 +1,34 @@
 import sublime
 import sublime_plugin
 
-import copy
 import os
 import re
 import shutil
+import threading
+import time
 
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
-from .json_file import JsonFile
+from .descriptions_store import DescriptionsStore
+from .instrumentation import profiler
+from .json_file import JsonFile, configure_load_cache, flush_pending_saves
+from .liveness import LivenessChecker, MISSING, UNREACHABLE
+from .ranking import ProjectRanking
+from .recent_store import RecentStore
+from .watcher import create_watcher
+from .window_registry import WindowRegistry
 from .utils import (
-    get_computer_name, pretty_path, expand_path,
+    get_computer_name, file_signature, pretty_path, expand_path,
     run_sublime, dont_close_windows_when_empty
 )
 
 
 SETTINGS_FILENAME = 'project_manager.sublime-settings'
+CACHE_VERSION = 2
+# Version of the migrations of the projects directories, to increment when one is
+# added to `ProjectsInfo.workspace_version_migrator`
+MIGRATIONS_VERSION = 2
 pm_settings = None
 
 
@@ -41,25 +54,107 @@ def preferences_migrator():
     sublime.save_settings(SETTINGS_FILENAME)
 
 
+def migrations_marker_file():
+    return os.path.join(sublime.cache_path(), 'ProjectManager', 'migrations.json')
+
+
+def needs_migrations(projects_info):
+    """Check whether the migrations of the current version were run in every
+    projects directory
+
+    The version and the directories in which the migrations were run are recorded in
+    a marker file in the cache directory of Sublime Text, so that they are only
+    run once.
+    """
+    marker = JsonFile(migrations_marker_file()).load({})
+    return (marker.get("version") != MIGRATIONS_VERSION
+            or not set(projects_info.projects_path()) <= set(marker.get("dirs", [])))
+
+
+def run_migrations(projects_info):
+    """Run the migrations and record them in the marker file"""
+    marker_file = JsonFile(migrations_marker_file(), compact=True)
+    marker = marker_file.load({})
+    dirs = set(projects_info.projects_path())
+    if marker.get("version") == MIGRATIONS_VERSION:
+        dirs.update(marker.get("dirs", []))
+
+    projects_info.workspace_version_migrator()
+    marker_file.save({"version": MIGRATIONS_VERSION, "dirs": sorted(dirs)})
+
+
+def start_project_manager():
+    """Second stage of the startup, run in the background once the plugins are
+    loaded: create the projects information, start watching the projects
+    directories and discover the projects, after running the migrations if they
+    weren't run yet"""
+    projects_info = ProjectsInfo.get_instance()
+    if pm_settings.get("watch_projects", True):
+        projects_info.start_watching()
+
+    def load_projects():
+        projects_info.refresh_projects_async(on_done=lambda changed: refresh_status_bars())
+
+    if needs_migrations(projects_info):
+        # Migrations may close the workspace of the active window, which must be done
+        # from the main thread
+        def migrate():
+            run_migrations(projects_info)
+            load_projects()
+
+        sublime.set_timeout(migrate, 0)
+    else:
+        load_projects()
+
+
 def plugin_loaded():
     global pm_settings
     pm_settings = sublime.load_settings(SETTINGS_FILENAME)
+    configure_profiler()
+    configure_json_cache()
     if pm_settings.has("projects_path") and pm_settings.get("projects") == "$default":
         preferences_migrator()
-    projects_info = ProjectsInfo.get_instance()
-
-    # Run with timeout so that `window.run_command("close_workspace")` works
-    sublime.set_timeout(projects_info.workspace_version_migrator, 0)
-    pm_settings.add_on_change("refresh_projects", projects_info.refresh_projects)
+    pm_settings.add_on_change("refresh_projects", on_settings_changed)
 
-    if pm_settings.get("display_in_status_bar", False):
-        for window in sublime.windows():
-            for view in window.views():
-                show_project_status_bar(view)
+    # Everything else is done in the background so that the plugin host startup
+    # isn't delayed. The window registry is built on first use
+    sublime.set_timeout_async(start_project_manager, 0)
 
 
 def plugin_unloaded():
     pm_settings.clear_on_change("refresh_projects")
+    projects_info = ProjectsInfo.get_instance(create=False)
+    if projects_info is not None:
+        projects_info.stop_watching()
+        projects_info.recent().flush()
+        projects_info.descriptions().flush()
+    flush_pending_saves()
+
+
+def configure_profiler():
+    profiler.configure(pm_settings.get("enable_instrumentation", False),
+                       pm_settings.get("instrumentation_buffer_size", 1000))
+
+
+def configure_json_cache():
+    configure_load_cache(int(pm_settings.get("json_cache_size_mb", 8) * (1 << 20)))
+
+
+def on_settings_changed():
+    configure_profiler()
+    configure_json_cache()
+    projects_info = ProjectsInfo.get_instance()
+    if pm_settings.get("watch_projects", True):
+        projects_info.start_watching()
+    else:
+        projects_info.stop_watching()
+    projects_info.refresh_projects_async()
+
+
+def refresh_status_bars():
+    if pm_settings.get("display_in_status_bar", False):
+        for window in sublime.windows():
+            show_project_status_bar(window.views())
 
 
 def format_directory(item, folder, nb_ws=0):
@@ -105,72 +200,183 @@ def format_files(item, paths):
         return [item, details]
 
 
-def show_project_status_bar(view):
-    if not pm_settings.get("display_in_status_bar", False):
-        return
+# Label of the status bar of each window: {window_id: (files, info, label)}
+status_labels = {}
+# Views whose status bar is updated at the next call of `flush_status_bars`
+pending_status_views = []
+
 
-    project_file = view.window().project_file_name()
+def get_status_label(window):
+    """Get the label displayed in the status bar of the views of a window
+
+    The label is computed again only if the project or workspace of the window, or
+    the projects information, changed.
+
+    Returns:
+        str: the label, or None if no label should be displayed
+    """
+    project_file = window.project_file_name()
     if not project_file:
-        return
+        return None
+
+    # Don't block the UI thread on the startup or on the initial scan: status bars
+    # are refreshed when it's over
+    projects_info = ProjectsInfo.get_instance(create=False)
+    if projects_info is None or not projects_info.is_loaded():
+        return None
+
+    workspace_file = None
+    if sublime.version() >= '4050':
+        workspace_file = window.workspace_file_name()
+
+    files = (project_file, workspace_file)
+    info = projects_info.info
+    cached = status_labels.get(window.id())
+    if cached is not None and cached[0] == files and cached[1] is info:
+        return cached[2]
 
-    projects_info = ProjectsInfo.get_instance()
     project_name = os.path.splitext(os.path.basename(project_file))[0]
-    project_info = projects_info.info[project_name]
+    project_info = info.get(project_name, {})
     project_group = project_info.get("group", "")
 
     display_name = '['
     display_name += project_group
     display_name += project_name
 
-    if sublime.version() >= '4050':
-        workspace_file = view.window().workspace_file_name()
+    if workspace_file is not None:
         workspace_name = os.path.splitext(os.path.basename(workspace_file))[0]
         if project_name != workspace_name:
             display_name += ':' + workspace_name
 
     display_name += ']'
 
-    view.set_status("00ProjectManager_project_name", display_name)
+    status_labels[window.id()] = (files, info, display_name)
+    return display_name
+
+
+def show_project_status_bar(views):
+    if not pm_settings.get("display_in_status_bar", False):
+        return
+
+    labels = {}
+    for view in views:
+        window = view.window()
+        if window is None:
+            continue
+        if window.id() not in labels:
+            labels[window.id()] = get_status_label(window)
+        if labels[window.id()] is not None:
+            view.set_status("00ProjectManager_project_name", labels[window.id()])
+
+
+def queue_project_status_bar(view):
+    """Update the status bar of a view along with the other views loaded at the same
+    time"""
+    if not pending_status_views:
+        sublime.set_timeout(flush_status_bars, 0)
+    pending_status_views.append(view)
+
+
+def flush_status_bars():
+    views = list(pending_status_views)
+    del pending_status_views[:]
+    show_project_status_bar(view for view in views if view.is_valid())
 
 
 # Display the current project name in the status bar
 class ProjectInStatusbar(sublime_plugin.EventListener):
     # When opening sublime text
     def on_init(self, views):
-        for view in views:
-            show_project_status_bar(view)
+        show_project_status_bar(views)
 
     # When creating a new empty file
     def on_new(self, view):
-        show_project_status_bar(view)
+        queue_project_status_bar(view)
 
     # When loading an existing file
     def on_load(self, view):
-        show_project_status_bar(view)
+        queue_project_status_bar(view)
 
     # When using File > New view into file on an existing file
     def on_clone(self, view):
-        show_project_status_bar(view)
+        queue_project_status_bar(view)
 
     # Remove project name when closing view
     def on_close(self, view):
         view.erase_status("00ProjectManager_project_name")
 
+    def on_pre_close_window(self, window):
+        status_labels.pop(window.id(), None)
+
+
+# Keep track of the projects and workspaces open in each window
+class WindowRegistryListener(sublime_plugin.EventListener):
+    def on_new_window(self, window):
+        WindowRegistry.get_instance().update(window)
+
+    def on_load_project(self, window):
+        WindowRegistry.get_instance().update(window)
+
+    def on_post_save_project(self, window):
+        WindowRegistry.get_instance().update(window)
+
+    def on_pre_close_project(self, window):
+        # The project is still attached to the window at this point
+        registry = WindowRegistry.get_instance()
+        registry.remove(window)
+        sublime.set_timeout(lambda: window.is_valid() and registry.update(window), 0)
+
+    def on_pre_close_window(self, window):
+        WindowRegistry.get_instance().remove(window)
+
 
 class ProjectsInfo:
+    # Minimum time between two revalidations of the projects information, in seconds
+    REVALIDATE_INTERVAL = 5
+
     _instance = None
+    _instance_lock = threading.Lock()
 
     def __init__(self):
-        self.refresh_projects()
+        self._info = None
+        self._index = {}
+        self._index_changed = False
+        self._cache_loaded = False
+        self._maintenance = self._new_maintenance()
+        self._buffers_cache = {}
+        self._dir_cache = {}
+        self._projects_path = []
+        self._recent = None
+        self._descriptions = None
+        self._liveness = LivenessChecker()
+        self._ranking = ProjectRanking()
+        self._lock = threading.Lock()
+        self._last_refresh = None
+
+        # Directories reported as changed by the watcher since the last refresh. If
+        # `_dirs_to_check` is None, every file is checked during the refresh
+        self._watcher = None
+        self._watcher_synced = False
+        self._watch_poll_interval = None
+        self._changed_dirs = set()
+        self._changed_dirs_lock = threading.Lock()
+        self._dirs_to_check = None
+
+        self._load_projects_path()
 
     @classmethod
-    def get_instance(cls):
-        if not cls._instance:
-            cls._instance = cls()
-        return cls._instance
+    def get_instance(cls, create=True):
+        """Get the projects information, creating it if `create` is True and it
+        doesn't exist yet (otherwise None is returned)"""
+        # The instance is created by the startup in the background, but may be needed
+        # by a command before
+        with cls._instance_lock:
+            if not cls._instance and create:
+                cls._instance = cls()
+            return cls._instance
 
     def projects_path(self):
-        return self._projects_path
+        return list(self._projects_path)
 
     def primary_dir(self):
         return self._primary_dir
@@ -178,10 +384,63 @@ class ProjectsInfo:
     def default_dir(self):
         return self._default_dir
 
+    def recent(self):
+        """Get the store of the recently opened projects, which lives in the primary
+        projects directory"""
+        recent_file = os.path.join(self._primary_dir, 'recent.jsonl')
+        if self._recent is None or self._recent.fpath != recent_file:
+            if self._recent is not None:
+                self._recent.flush()
+            self._recent = RecentStore(recent_file)
+        self._recent.depth = max(1, pm_settings.get("recent_history_depth", 1000))
+        return self._recent
+
+    def liveness(self):
+        """Get the checker of the existence of the projects folders"""
+        self._liveness.timeout = pm_settings.get("liveness_timeout", 2)
+        self._liveness.ttl = pm_settings.get("liveness_cache_ttl", 60)
+        self._liveness.workers = max(1, pm_settings.get("scan_workers", 4))
+        return self._liveness
+
+    def descriptions(self):
+        """Get the store of the descriptions of projects and workspaces, which lives in
+        the primary projects directory"""
+        desc_file = os.path.join(self._primary_dir, 'descriptions.json')
+        if self._descriptions is None or self._descriptions.fpath != desc_file:
+            if self._descriptions is not None:
+                self._descriptions.flush()
+            self._descriptions = DescriptionsStore(desc_file)
+        return self._descriptions
+
     @property
     def info(self):
+        # The projects are loaded from the cache or scanned on first use if the
+        # background scan isn't over
+        if self._info is None:
+            with self._lock:
+                if self._info is None and not self._load_cache():
+                    self._refresh_projects()
         return self._info
 
+    def rank_projects(self, open_projects):
+        """Get the projects in the order in which to display them
+
+        Args:
+            open_projects: set[str]
+                The names of the projects open in a window
+
+        Returns:
+            list[str]: the names of the projects
+        """
+        return self._ranking.order(
+            self.info, self.recent(), open_projects,
+            recent_first=pm_settings.get('show_recent_projects_first', True),
+            active_first=pm_settings.get('show_active_projects_first', True),
+            by_frecency=pm_settings.get('recent_projects_ranking', 'frecency') == 'frecency')
+
+    def is_loaded(self):
+        return self._info is not None
+
     def which_project_dir(self, pfile):
         pfile = expand_path(pfile)
         for pdir in self._projects_path:
@@ -190,11 +449,265 @@ class ProjectsInfo:
                 return pdir
         return None
 
-    def refresh_projects(self):
+    def refresh_projects(self, full=False):
+        """Update the projects information
+
+        Only the project files that changed since the last refresh are parsed again.
+
+        Args:
+            full: bool
+                If True, drop the index and parse every project file
+        """
+        with self._lock:
+            self._refresh_projects(full)
+
+    def refresh_projects_async(self, full=False, on_done=None):
+        """Update the projects information in a background thread
+
+        Until the refresh is over, the previous information is kept available.
+
+        Args:
+            full: bool
+                If True, drop the index and parse every project file
+            on_done: callable
+                Called on the main thread when the refresh is over, with a boolean
+                indicating whether the projects information changed
+        """
+        def refresh():
+            previous_info = self._info
+            self.refresh_projects(full)
+            if on_done:
+                changed = previous_info != self._info
+                sublime.set_timeout(lambda: on_done(changed), 0)
+
+        sublime.set_timeout_async(refresh, 0)
+
+    def revalidate_async(self, on_done=None):
+        """Check in the background whether the projects information is still
+        up-to-date
+
+        Nothing is done if a reliable watcher keeps it up-to-date, or if it was
+        refreshed less than `REVALIDATE_INTERVAL` seconds ago.
+
+        Args:
+            on_done: callable
+                As for `refresh_projects_async`
+        """
+        watcher = self._watcher
+        if watcher is not None and watcher.reliable and self._watcher_synced:
+            return
+        now = time.monotonic()
+        last_refresh = self._last_refresh
+        if last_refresh is not None and now - last_refresh < self.REVALIDATE_INTERVAL:
+            return
+
+        # Also set when the refresh is over, but set now so that the commands run
+        # in the meantime don't queue other refreshes
+        self._last_refresh = now
+        self.refresh_projects_async(on_done=on_done)
+
+    @profiler.profiled('ProjectsInfo.refresh_projects')
+    def _refresh_projects(self, full=False, trust_watcher=False):
+        previous_projects_path = self._projects_path
+        self._load_projects_path()
+
+        # Groups depend on the projects directories, so the index can't be reused
+        if full or self._projects_path != previous_projects_path:
+            self._index = {}
+            self._dir_cache = {}
+        elif not self._cache_loaded:
+            self._load_cache()
+
+        # If a reliable watcher has been watching every path since the last refresh,
+        # only the directories it reported need to be checked. This is only done for
+        # refreshes triggered by the watcher, as other ones may follow a change that
+        # the watcher didn't report yet
+        with self._changed_dirs_lock:
+            changed_dirs, self._changed_dirs = self._changed_dirs, set()
+        watcher = self._watcher
+        if (trust_watcher and watcher is not None and watcher.reliable
+                and self._watcher_synced and not full):
+            self._dirs_to_check = changed_dirs
+        else:
+            self._dirs_to_check = None
+
+        self._maintenance = self._new_maintenance()
+        info = self._get_all_projects_info()
+        # Keep the same object if nothing changed so that what is computed from the
+        # projects information can be reused
+        if info != self._info:
+            self._info = info
+        if self._index_changed:
+            self._save_cache()
+
+        if not pm_settings.get("read_only_discovery", False):
+            self._run_maintenance()
+
+        if watcher is not None:
+            self._watcher_synced = watcher.watch(self._watched_paths())
+        self._last_refresh = time.monotonic()
+
+    def _new_maintenance(self):
+        return {"libraries": {}, "workspaces": set(), "empty_dirs": set()}
+
+    def run_maintenance(self):
+        """Apply the changes to the projects directories found necessary during the
+        last refresh"""
+        with self._lock:
+            self._run_maintenance()
+
+    @profiler.profiled('ProjectsInfo.run_maintenance')
+    def _run_maintenance(self):
+        """Rewrite the libraries that need to be cleaned up, create the missing
+        default workspaces and remove the empty directories
+
+        Discovery itself never writes anything, so that it works on read-only
+        projects directories and only costs stat and read calls: the changes it
+        finds necessary are gathered and applied here in one go.
+        """
+        maintenance, self._maintenance = self._maintenance, self._new_maintenance()
+        for library, pfiles in maintenance["libraries"].items():
+            JsonFile(library).save(pfiles)
+
+        for wfile in maintenance["workspaces"]:
+            self.ensure_workspace(wfile)
+
+        # Deepest directories first so that their parents can be removed too
+        for directory in sorted(maintenance["empty_dirs"], reverse=True):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+
+    def ensure_workspace(self, wfile):
+        """Create a default workspace file if it doesn't exist"""
+        if not os.path.exists(wfile):
+            pfile = re.sub(r'\.sublime-workspace$', '.sublime-project', wfile)
+            JsonFile(wfile).save({'project': os.path.basename(pfile)})
+
+    def start_watching(self):
+        """Watch the projects directories to refresh the projects information as soon
+        as something changes
+
+        If the projects directories are already watched, the watcher is only
+        restarted if `watch_poll_interval` changed.
+        """
+        poll_interval = pm_settings.get("watch_poll_interval", 5)
+        if self._watcher is not None:
+            if poll_interval == self._watch_poll_interval:
+                return
+            self.stop_watching()
+
+        self._watcher_synced = False
+        self._watch_poll_interval = poll_interval
+        self._watcher = create_watcher(self._on_paths_changed, poll_interval)
+        self._watcher.start()
+        if self.is_loaded():
+            self.refresh_projects_async()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def _on_paths_changed(self, dirs):
+        """Called from the watcher thread when something changed in `dirs`, or with
+        None if the changes couldn't be tracked"""
+        if dirs is None:
+            self._watcher_synced = False
+        else:
+            with self._changed_dirs_lock:
+                self._changed_dirs.update(dirs)
+
+        def refresh():
+            with self._lock:
+                self._refresh_projects(trust_watcher=True)
+
+        sublime.set_timeout_async(refresh, 0)
+
+    def _watched_paths(self):
+        paths = set(self._dir_cache)
+        for pdir in self._projects_path:
+            paths.add(os.path.join(pdir, 'library.json'))
+        for info in self._info.values():
+            if info["type"] == "library":
+                paths.add(info["file"])
+                paths.add(os.path.dirname(info["file"]))
+        return paths
+
+    def _is_dir_unchanged(self, path):
+        return self._dirs_to_check is not None and path not in self._dirs_to_check
+
+    def _cache_file(self):
+        # Stored out of the projects directories, which may be read-only or shared
+        # with other computers
+        return os.path.join(sublime.cache_path(), 'ProjectManager', 'projects_index.json')
+
+    def _cache_key(self):
+        return {"projects": pm_settings.get('projects'), "hostname": get_computer_name()}
+
+    def _load_cache(self):
+        """Load the index saved by a previous session
+
+        Its entries are checked against the files they were built from at the next
+        refresh.
+
+        Returns:
+            bool: whether the cache was loaded
+        """
+        self._cache_loaded = True
+        cache_file = JsonFile(self._cache_file(), strict=True)
+        if not os.path.exists(cache_file.fpath):
+            return False
+        try:
+            data = cache_file.load({}, quiet=True)
+        except (OSError, ValueError):
+            return False
+
+        if (not isinstance(data, dict) or data.get("version") != CACHE_VERSION
+                or data.get("key") != self._cache_key()):
+            return False
+
+        def as_signature(signature):
+            return tuple(signature) if signature is not None else None
+
+        try:
+            index = {}
+            for pfile, entry in data["index"].items():
+                entry["signature"] = as_signature(entry["signature"])
+                entry["folder_signature"] = as_signature(entry["folder_signature"])
+                entry["workspaces"] = {wfile: as_signature(signature)
+                                       for wfile, signature in entry["workspaces"].items()}
+                index[pfile] = entry
+            info = {pname: index[pfile]["info"] for pname, pfile in data["projects"]}
+        except (KeyError, TypeError, AttributeError, ValueError):
+            return False
+
+        self._index = index
+        self._info = info
+        return True
+
+    @profiler.profiled('ProjectsInfo.save_cache')
+    def _save_cache(self):
+        data = {
+            "version": CACHE_VERSION,
+            "key": self._cache_key(),
+            "index": dict(self._index),
+            "projects": [[pname, info["file"]] for pname, info in self._info.items()],
+        }
+        # Successive refreshes only write the cache once. If it can't be written (e.g.
+        # in a read-only directory), it's tried again at the next refresh
+        def on_error():
+            self._index_changed = True
+
+        self._index_changed = False
+        JsonFile(self._cache_file(), compact=True).save_later(data, on_error=on_error)
+
+    def _load_projects_path(self):
         self._default_dir = os.path.join(
             sublime.packages_path(), 'User', 'Projects')
 
-        self._projects_path = []
+        projects_path = []
 
         user_projects_dirs = pm_settings.get('projects')
         node = get_computer_name()
@@ -212,12 +725,12 @@ class ProjectsInfo:
             p = expand_path(folder)
             p = p.replace("$default", self._default_dir)
             p = p.replace("$hostname", node)
-            self._projects_path.append(p)
+            projects_path.append(p)
 
-        if self._default_dir not in self._projects_path:
-            self._projects_path.append(self._default_dir)
+        if self._default_dir not in projects_path:
+            projects_path.append(self._default_dir)
 
-        self._projects_path = [expand_path(d) for d in self._projects_path]
+        self._projects_path = [expand_path(d) for d in projects_path]
 
         self._primary_dir = self._projects_path[0]
 
@@ -227,19 +740,28 @@ class ProjectsInfo:
         if not os.path.isdir(self._primary_dir):
             raise Exception("Directory \"{}\" does not exist.".format(self._primary_dir))
 
-        self._info = self._get_all_projects_info()
-
     def workspace_version_migrator(self):
-        # Clear recent projects file if it doesn't support workspaces
+        # Clear recent projects file if it doesn't support workspaces. It's converted
+        # by `RecentStore`, which removes it: it must not be created again
         json_file = JsonFile(os.path.join(self._primary_dir, 'recent.json'))
-        recent_files = json_file.load()
+        recent_files = json_file.load() if os.path.exists(json_file.fpath) else []
         if recent_files and type(recent_files[0]) != dict:
             json_file.remove()
             sublime.run_command("clear_recent_projects_and_workspaces")
 
+        # The index of the projects used to be cached in the primary directory
+        legacy_cache = os.path.join(self._primary_dir, 'cache.json')
+        try:
+            with open(legacy_cache, mode='r', encoding='utf-8') as f:
+                is_index = "index" in sublime.decode_value(f.read())
+            if is_index:
+                os.remove(legacy_cache)
+        except (OSError, ValueError, TypeError):
+            pass
+
         # Update file organization and reload info if needed
         if self._reorganize_files():
-            self._info = self._get_all_projects_info()
+            self.refresh_projects(full=True)
 
     def _reorganize_files(self):
         """Reorganize files in project directories (for compatibility)
@@ -304,7 +826,7 @@ class ProjectsInfo:
                     active_window.run_command("close_workspace")
 
                 # Move all of its existing workspaces files
-                for wfile in self._info[pname]['workspaces']:
+                for wfile in self.info[pname]['workspaces']:
                     try:
                         shutil.move(wfile, directory)
                     except Exception:
@@ -324,51 +846,179 @@ class ProjectsInfo:
         return modified
 
     def _get_all_projects_info(self):
+        pfiles = []
+        dir_cache = {}
+        with profiler.timed('ProjectsInfo.discover_project_files') as timer:
+            for pdir in self._projects_path:
+                pfiles.extend((f, "library") for f in self._load_library(pdir))
+                pfiles.extend((f, "sublime-project")
+                              for f in self._load_sublime_project_files(pdir, dir_cache))
+            timer.count('project_files', len(pfiles))
+            timer.count('directories', len(dir_cache))
+
+        with profiler.timed('ProjectsInfo.index_project_files'):
+            entries = self._get_index_entries(set(f for f, _ in pfiles))
+
+        # Merge in discovery order so that the last project found wins on duplicates
         all_projects_info = {}
-        for pdir in self._projects_path:
-            for f in self._load_library(pdir):
-                info = self._get_info_from_project_file(f)
-                info["type"] = "library"
-                all_projects_info[info["name"]] = info
+        index = {}
+        for f, ptype in pfiles:
+            index[f] = entries[f]
+            info = entries[f]["info"]
+            info["type"] = ptype
+            all_projects_info[info["name"]] = info
+
+        # Forget about the project files that no longer exist
+        if len(index) != len(self._index):
+            self._index_changed = True
+        self._index = index
+        self._dir_cache = dir_cache
+        wfiles = set()
+        for entry in index.values():
+            wfiles.update(entry["workspaces"])
+        self._buffers_cache = {wfile: cached for wfile, cached in self._buffers_cache.items()
+                               if wfile in wfiles}
+        return all_projects_info
 
-            for f in self._load_sublime_project_files(pdir):
-                info = self._get_info_from_project_file(f)
-                info["type"] = "sublime-project"
-                all_projects_info[info["name"]] = info
+    def _get_index_entries(self, pfiles):
+        """Get the index entries of several project files
 
-        return all_projects_info
+        As checking and parsing project files is mostly spent waiting for I/O (which
+        can be slow on network mounts), it's done in a thread pool whose size is set
+        by the `scan_workers` setting.
+
+        Returns:
+            dict: the index entry of every project file
+        """
+        pfiles = list(pfiles)
+        workers = pm_settings.get("scan_workers", 4)
+        if workers > 1 and len(pfiles) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(pfiles))) as executor:
+                return dict(zip(pfiles, executor.map(self._get_index_entry, pfiles)))
+        return {pfile: self._get_index_entry(pfile) for pfile in pfiles}
+
+    def _get_index_entry(self, pfile):
+        """Get the index entry of a project file, parsing it only if it changed since
+        the last time it was indexed
+
+        Args:
+            pfile: str
+                The path of the .sublime-project file
+
+        Returns:
+            dict: the entry, with the information of the project under "info"
+        """
+        entry = self._index.get(pfile)
+        if entry is None or not self._is_entry_valid(pfile, entry):
+            info = self._get_info_from_project_file(pfile)
+            entry = {
+                "signature": file_signature(pfile),
+                "folder_signature": file_signature(os.path.dirname(pfile)),
+                "workspaces": {wfile: file_signature(wfile) for wfile in info["workspaces"]},
+                "info": info,
+            }
+            self._index_changed = True
+        return entry
+
+    def _is_entry_valid(self, pfile, entry):
+        """Check if the indexed entry of a project file is still up-to-date
+
+        The project file, its folder (which changes when workspaces are added or
+        removed) and each of its workspaces must be in the same state as when the
+        entry was built.
+        """
+        if self._is_dir_unchanged(os.path.dirname(pfile)):
+            return True
+
+        if file_signature(pfile) != entry["signature"]:
+            return False
+        if file_signature(os.path.dirname(pfile)) != entry["folder_signature"]:
+            return False
+        for wfile, signature in entry["workspaces"].items():
+            if file_signature(wfile) != signature:
+                return False
+        return True
 
     def _load_library(self, folder):
         pfiles = []
         library = os.path.join(folder, 'library.json')
         if os.path.exists(library):
-            j = JsonFile(library)
-            for f in j.load():
+            data = JsonFile(library).load()
+            for f in data:
                 pfile = expand_path(f)
                 if os.path.exists(pfile) and pfile not in pfiles:
                     pfiles.append(os.path.normpath(pfile))
 
             pfiles.sort()
-            j.save(pfiles)
+            if pfiles != data:
+                self._maintenance["libraries"][library] = pfiles
 
         return pfiles
 
-    def _load_sublime_project_files(self, folder):
+    def _load_sublime_project_files(self, folder, dir_cache):
+        """Walk a projects directory (following symlinks) to find every project file
+
+        The content of the directories that didn't change since the last refresh
+        is taken from the cache.
+
+        Args:
+            folder: str
+                The projects directory to walk
+            dir_cache: dict
+                The cache being built, in which the content of every directory
+                visited is stored
+        """
         pfiles = []
-        for path, dirs, files in os.walk(folder, followlinks=True):
-            for f in files:
-                f = os.path.join(path, f)
-                if f.endswith('.sublime-project') and f not in pfiles:
-                    pfiles.append(os.path.normpath(f))
-
-            # remove empty directories
-            for d in dirs:
-                d = os.path.join(path, d)
-                if os.path.exists(d) and len(os.listdir(d)) == 0:
-                    os.rmdir(d)
+        dirs = [folder]
+        while dirs:
+            path = dirs.pop()
+            listing = self._list_dir(path)
+            if listing is None:
+                continue
+
+            signature, files, subdirs = listing
+            # empty directories are removed during maintenance
+            if path != folder and not files and not subdirs:
+                self._maintenance["empty_dirs"].add(path)
+
+            dir_cache[path] = listing
+            pfiles.extend(os.path.normpath(os.path.join(path, f))
+                          for f in files if f.endswith('.sublime-project'))
+            dirs.extend(os.path.join(path, d) for d in reversed(subdirs))
 
         return pfiles
 
+    def _list_dir(self, path):
+        """Get the files and subdirectories of a directory
+
+        Returns:
+            (tuple, list[str], list[str]): the signature of the directory, the names
+                of its files and the names of its subdirectories, or None if it
+                can't be listed
+        """
+        cached = self._dir_cache.get(path)
+        if cached is not None and self._is_dir_unchanged(path):
+            return cached
+
+        signature = file_signature(path)
+        if cached is not None and cached[0] == signature:
+            return cached
+
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return None
+
+        files = []
+        subdirs = []
+        for name in names:
+            if os.path.isdir(os.path.join(path, name)):
+                subdirs.append(name)
+            else:
+                files.append(name)
+        return (signature, files, subdirs)
+
+    @profiler.profiled('ProjectsInfo.parse_project_file')
     def _get_info_from_project_file(self, pfile):
         pdir = self.which_project_dir(pfile)
         info = {}
@@ -395,6 +1045,9 @@ class ProjectsInfo:
         info["name"] = pname
         info["folder"] = folder
         info["file"] = pfile
+        # Keys of the project in the recent history and in the descriptions
+        info["pretty_file"] = pretty_path(pfile)
+        info["desc_file"] = os.path.expanduser(info["pretty_file"])
         info["workspaces"] = self._get_project_workspaces(pfile)
         info["group"] = group
         return info
@@ -408,6 +1061,7 @@ class ProjectsInfo:
 
         Returns:
             list: the list of .sublime-workspace files associated with the given project
+                (if there is none, the default workspace, which may not exist yet)
         """
         folder = os.path.dirname(pfile)
         pname = os.path.basename(pfile)
@@ -419,15 +1073,34 @@ class ProjectsInfo:
                     and self._is_workspace_affiliated(pname, file)):
                 wfiles.append(os.path.normpath(file))
 
-        # If no workspace exists, create a default one
+        # If no workspace exists, use a default one, created during maintenance or
+        # when the project is opened
         if not wfiles:
-            wfile = re.sub(r'\.sublime-project$', '.sublime-workspace', pfile)
-            j = JsonFile(wfile)
-            j.save({'project': pname})
-            wfiles.append(os.path.normpath(wfile))
+            wfile = os.path.normpath(re.sub(r'\.sublime-project$', '.sublime-workspace', pfile))
+            self._maintenance["workspaces"].add(wfile)
+            wfiles.append(wfile)
 
         return wfiles
 
+    def workspace_buffers(self, wfile):
+        """Get the list of files opened in a workspace
+
+        The result is cached until the workspace file changes.
+
+        Args:
+            wfile: str
+                The path of the .sublime-workspace file
+
+        Returns:
+            list[str]: the paths of the files of the workspace buffers
+        """
+        signature = file_signature(wfile)
+        cached = self._buffers_cache.get(wfile)
+        if cached is None or cached[0] != signature:
+            cached = (signature, JsonFile(wfile).load_array_field("buffers", "file"))
+            self._buffers_cache[wfile] = cached
+        return cached[1]
+
     def _is_workspace_affiliated(self, project, wfile):
         """Check if a workspace corresponds to a workspace of `project`
 
@@ -440,29 +1113,37 @@ class ProjectsInfo:
         Returns:
             bool: whether the workspace is indeed affiliated with the given project
         """
-        j = JsonFile(wfile).load()
-        if "project" not in j:
+        wproject = JsonFile(wfile).load_key("project")
+        if not isinstance(wproject, str):
             return False
-        return os.path.basename(j["project"]) == project
+        return os.path.basename(wproject) == project
 
 
 class Manager:
     """Main class that takes care of everything project and workspace related"""
 
+    # Rendered items of the project quick panel: {project: (key, (name, item))}
+    _display_items = {}
+
     def __init__(self, window):
         self.window = window
         self.projects_info = ProjectsInfo.get_instance()
+        self.windows = WindowRegistry.get_instance()
         self.refresh_curr_project()
 
     def refresh_curr_project(self):
+        # Without the listener hooks (before Sublime Text 4050), the windows may have
+        # changed since the last command
+        self.windows.sync()
         pname = self.window.project_file_name()
         if pname:
             self.curr_pname = os.path.basename(re.sub(r'\.sublime-project$', '', pname))
         else:
             self.curr_pname = None
 
-        self.desc_path = os.path.join(self.projects_info.primary_dir(), 'descriptions.json')
-        self.descriptions = JsonFile(self.desc_path).load({})
+        self.descriptions = self.projects_info.descriptions()
+        self.descriptions.reload_if_changed()
+        self.desc_path = self.descriptions.fpath
 
     def nb_workspaces(self, project=None):
         """Returns the number of workspaces a given project has saved
@@ -503,91 +1184,84 @@ class Manager:
                 return workspace
 
         # Else, try to get the most recent
-        recent_file = os.path.join(self.projects_info.primary_dir(), 'recent.json')
-        if not os.path.exists(recent_file):
-            return workspaces[0]
-
-        j = JsonFile(recent_file)
-        recent = j.load()
-        if project not in [pw['project'] for pw in recent]:
-            return workspaces[0]
-        else:
-            return recent[project]["workspaces"][-1]
+        pfile = self.projects_info.info[project]['pretty_file']
+        for wfile in reversed(self.projects_info.recent().workspaces(pfile)):
+            if wfile in workspaces:
+                return wfile
+        return workspaces[0]
 
     def is_workspace_open(self, ws_file):
         if sublime.version() < '4050':
             return False
 
-        open_workspaces = [
-            os.path.realpath(w.workspace_file_name())
-            for w in sublime.windows() if w.workspace_file_name()]
-
-        return ws_file in open_workspaces
+        return self.windows.is_workspace_open(ws_file)
 
+    @profiler.profiled('Manager.display_projects')
     def display_projects(self):
-        info = copy.deepcopy(self.projects_info.info)
-        self.mark_open_projects(info)
-        plist = list(map(self.render_display_item, info.items()))
-        plist.sort(key=lambda p: p[0])
-        if pm_settings.get('show_recent_projects_first', True):
-            self.move_recent_projects_to_top(plist)
-
-        if pm_settings.get('show_active_projects_first', True):
-            self.move_opened_projects_to_top(plist)
-
+        info = self.projects_info.info
+        open_projects = self.get_open_projects(info)
+        display_settings = (
+            str(pm_settings.get('active_project_indicator', '*')),
+            str(pm_settings.get('project_display_format',
+                                '{project_group}{project_name}{active_project_indicator}')),
+            pm_settings.get('activate_workspaces', True))
+
+        # Items are only rendered again if what they display changed
+        display_items = {}
         pnames = []
         pdesc = []
-        for pname, pdisplay, ppath, pfile, nb_ws in plist:
-            pnames.append(pname)
-            pfile = os.path.expanduser(pfile)
-            if pfile in self.descriptions:
-                pdesc.append([pdisplay, self.descriptions[pfile]])
+        for project in self.projects_info.rank_projects(open_projects):
+            pinfo = info[project]
+            key = (pinfo['group'], pinfo['folder'], pinfo['file'], len(pinfo['workspaces']),
+                   project in open_projects,
+                   self.descriptions.get(pinfo['desc_file']),
+                   display_settings)
+            cached = self._display_items.get(project)
+            if cached is not None and cached[0] == key:
+                item = cached[1]
             else:
-                pdesc.append(format_directory(pdisplay, ppath, nb_ws))
+                item = self.render_display_item(project, pinfo, project in open_projects)
+            display_items[project] = (key, item)
+            pnames.append(project)
+            pdesc.append(item)
+
+        Manager._display_items = display_items
         return pnames, pdesc
 
-    def mark_open_projects(self, info):
-        project_file_names = [
-            os.path.realpath(w.project_file_name())
-            for w in sublime.windows() if w.project_file_name()]
+    def get_open_projects(self, info):
+        """Get the names of the projects open in a window"""
+        return set(project for project, pinfo in info.items()
+                   if self.windows.is_project_open(pinfo["file"]))
+
+    def render_display_item(self, project_name, info, active):
+        """Render the item of a project in the project quick panel
 
-        for v in info.values():
-            if os.path.realpath(v["file"]) in project_file_names:
-                v["star"] = True
+        Args:
+            project_name: str
+                The name of the project
+            info: dict
+                The information of the project
+            active: bool
+                Whether the project is open in a window
 
-    def render_display_item(self, item):
-        project_name, info = item
+        Returns:
+            the item, with the description of the project if it has one
+        """
         active_project_indicator = str(pm_settings.get('active_project_indicator', '*'))
         display_format = str(pm_settings.get(
             'project_display_format', '{project_group}{project_name}{active_project_indicator}'))
-        if "star" not in info:
+        if not active:
             active_project_indicator = ''
 
         display_name = display_format.format(project_name=project_name,
                                              project_group=info["group"],
                                              active_project_indicator=active_project_indicator)
-        return [
-            project_name,
-            display_name.strip(),
-            info['folder'],
-            pretty_path(info['file']),
-            len(info['workspaces'])]
-
-    def move_recent_projects_to_top(self, plist):
-        j = JsonFile(os.path.join(self.projects_info.primary_dir(), 'recent.json'))
-        recent = j.load()
-        recent = [pretty_path(obj["project"]) for obj in recent]
-        plist.sort(key=lambda p: recent.index(p[3]) if p[3] in recent else -1,
-                   reverse=True)
-
-    def move_opened_projects_to_top(self, plist):
-        count = 0
-        active_project_indicator = str(pm_settings.get('active_project_indicator', '*'))
-        for i in range(len(plist)):
-            if plist[i][1].endswith(active_project_indicator):
-                plist.insert(count, plist.pop(i))
-                count = count + 1
+        pfile = info['desc_file']
+        if pfile in self.descriptions:
+            return [display_name.strip(), self.descriptions[pfile]]
+        return format_directory(display_name.strip(), info['folder'], len(info['workspaces']))
 
+    @profiler.profiled('Manager.display_workspaces')
     def display_workspaces(self, project):
         """Return a list of path to project's workspaces and a list of display elements
         for each of these workspaces.
@@ -634,10 +1308,6 @@ class Manager:
 
         # Change name of default workspace (cf. method `get_default_workspace`) to
         # "(Default)" ; and mark open workspaces
-        workspaces_file_names = []
-        if sublime.version() >= '4050':
-            workspaces_file_names = [os.path.realpath(w.workspace_file_name())
-                                     for w in sublime.windows() if w.workspace_file_name()]
 
         active_workspace_indicator = str(pm_settings.get('active_workspace_indicator', '*'))
         wpaths = []
@@ -646,7 +1316,7 @@ class Manager:
             wpaths.append(wfile)
             if wname == project:
                 wname = '(Default)'
-            if wfile in workspaces_file_names:
+            if self.is_workspace_open(wfile):
                 wname += active_workspace_indicator
             if wfile in self.descriptions:
                 wdesc.append([wname, self.descriptions[wfile]])
@@ -669,20 +1339,15 @@ class Manager:
                 workspace contains
         """
         wname = os.path.basename(re.sub(r'\.sublime-workspace$', '', wfile))
-        winfo = JsonFile(wfile).load()
-        if "buffers" not in winfo:
-            return [wfile, wname, []]
-
-        wbuffer_info = winfo["buffers"]
-        wbuffers = [buffer['file'] for buffer in wbuffer_info if 'file' in buffer]
-
+        wbuffers = self.projects_info.workspace_buffers(wfile)
         return [wfile, wname, wbuffers]
 
     def move_recent_workspaces_to_top(self, project, wlist, move_second):
         """Sort a list of workspaces according to their date and time of last opening
 
-        This method sort workspaces according to their index in the `recent.json` file,
-        placing the most recent ones on top of the list.
+        This method sort workspaces according to their rank in the recent history, or
+        to their frecency score if `recent_projects_ranking` is "frecency", placing
+        the most recent ones on top of the list.
         If `move_second` is True, check if this most recent workspace belongs to
         the project opened in the current window. If it's the case, then switch the
         first and second items in the list. This is to make sure that when switching
@@ -698,22 +1363,18 @@ class Manager:
             move_second: bool
                 Whether to move the most recently opened workspace in second position
         """
-        j = JsonFile(os.path.join(self.projects_info.primary_dir(), 'recent.json'))
-        recent = j.load()
-
-        # We look for the project in the `recent.json` file and extract the list of its
-        # workspaces (sorted by most recently opened)
-        for obj in recent:
-            pname = os.path.basename(re.sub(r'\.sublime-project$', '', obj["project"]))
-            if pname == project:
-                recent = obj["workspaces"]
-                break
-        else:
+        # Extract the list of the project's workspaces (sorted by most recently opened)
+        pfile = self.projects_info.info[project]['pretty_file']
+        recent = self.projects_info.recent().workspaces(pfile)
+        if not recent:
             return
 
-        # Sort workspaces according to their index in the recent list
-        wlist.sort(key=lambda w: recent.index(w[0]) if w[0] in recent else -1,
-                   reverse=True)
+        # Sort workspaces according to their score or their index in the recent list
+        if pm_settings.get('recent_projects_ranking', 'frecency') == 'frecency':
+            ranks = self.projects_info.recent().workspace_scores(pfile)
+        else:
+            ranks = {wfile: rank for rank, wfile in enumerate(recent)}
+        wlist.sort(key=lambda w: ranks.get(w[0], float('-inf')), reverse=True)
 
         # Switch first and second if the current window is in a project...
         if move_second and self.curr_pname is not None:
@@ -721,7 +1382,7 @@ class Manager:
             if self.curr_pname != project:
                 return
 
-            if wlist[0][0] in recent:
+            if len(wlist) > 1 and wlist[0][0] == recent[-1]:
                 wlist[0], wlist[1] = wlist[1], wlist[0]
 
     def move_default_workspace_to_top(self, project, wlist):
@@ -745,8 +1406,8 @@ class Manager:
                 break
 
     def update_recent(self, project, wfile=None):
-        """Update the `recent.json` file to put the given project and workspace in most
-        recent spot
+        """Record the opening of the given project and workspace in the recent history
+        to put them in most recent spot
 
         Args:
             project: str
@@ -754,60 +1415,37 @@ class Manager:
             wfile: str
                 The path of the workspace file
         """
-        j = JsonFile(os.path.join(self.projects_info.primary_dir(), 'recent.json'))
-        recent = j.load()
-        pfile = pretty_path(self.projects_info.info[project]["file"])
+        pfile = self.projects_info.info[project]["pretty_file"]
 
         # If no workspace is given, take the default one
         if wfile is None:
             wfile = re.sub(r'\.sublime-project$', '.sublime-workspace', pfile)
 
-        # Run through the recent file to find the given project and move the given
-        # workspace to the end of the wlist
-        for i, pobject in enumerate(recent):
-            if pfile == pobject["project"]:
-                wlist = pobject["workspaces"]
-                if wfile in wlist:
-                    wlist.remove(wfile)
-                wlist.append(wfile)
-                recent.pop(i)
-                break
-        else:
-            wlist = [wfile]
-
-        # Move the project to the end of the recent list
-        recent.append({"project": pfile, "workspaces": wlist})
-
-        # Only keep the most recent 50 records
-        if len(recent) > 50:
-            recent = recent[(50 - len(recent)):len(recent)]
-        j.save(recent)
+        self.projects_info.recent().update(pfile, wfile)
 
     def clear_recent_projects(self):
         def clear_callback():
             if not sublime.ok_cancel_dialog("Clear recent projects ?"):
                 return
 
-            j = JsonFile(os.path.join(self.projects_info.primary_dir(), 'recent.json'))
-            j.remove()
+            self.projects_info.recent().clear()
             self.window.run_command("clear_recent_projects_and_workspaces")
 
         sublime.set_timeout(clear_callback, 100)
 
     def close_project(self, project):
-        pfile = os.path.realpath(self.projects_info.info[project]["file"])
+        pfile = self.projects_info.info[project]["file"]
         closed_workspaces = []
-        for w in sublime.windows():
-            if w.project_file_name() and os.path.realpath(w.project_file_name()) == pfile:
-                if sublime.version() > '4050':
-                    # Put active workspace in first position to reopen later
-                    if w.id() == sublime.active_window().id():
-                        closed_workspaces.insert(0, w.workspace_file_name())
-                    else:
-                        closed_workspaces.append(w.workspace_file_name())
-                w.run_command('close_workspace')
-                if w.id() != sublime.active_window().id():
-                    w.run_command('close_window')
+        for w in self.windows.project_windows(pfile):
+            if sublime.version() > '4050':
+                # Put active workspace in first position to reopen later
+                if w.id() == sublime.active_window().id():
+                    closed_workspaces.insert(0, w.workspace_file_name())
+                else:
+                    closed_workspaces.append(w.workspace_file_name())
+            w.run_command('close_workspace')
+            if w.id() != sublime.active_window().id():
+                w.run_command('close_window')
 
         return closed_workspaces
 
@@ -835,9 +1473,8 @@ class Manager:
     def close_workspace(self, wfile):
         if not sublime.version() > '4050':
             return
-        for w in sublime.windows():
-            if w.workspace_file_name() == wfile:
-                w.run_command('close_window')
+        for w in self.windows.workspace_windows(wfile):
+            w.run_command('close_window')
 
     def prompt_directory(self, callback, on_cancel=None):
         primary_dir = self.projects_info.primary_dir()
@@ -950,6 +1587,8 @@ class Manager:
                 sublime.message_dialog("Another workspace is already named " + new_workspace)
                 return
 
+            self.projects_info.ensure_workspace(wfile)
+
             # Trick: instead of using obscure undocumented sublime commands to create a
             # new workspace file, copy an existing sublime-workspace file and reset
             # its data to get a new one
@@ -1048,12 +1687,14 @@ class Manager:
                  for f in pd.get('folders')]
         run_sublime('-a', *paths)
 
+    @profiler.profiled('Manager.switch_project')
     @dont_close_windows_when_empty
     def switch_project(self, project, workspace=None):
         if project is None:
             project = self.curr_pname
         if workspace is None:
             workspace = self.get_default_workspace(project)
+        self.projects_info.ensure_workspace(workspace)
         self.update_recent(project, workspace)
         self.window.run_command("close_workspace")
         if pm_settings.get("reopen_project_goto", True):
@@ -1062,14 +1703,16 @@ class Manager:
         else:
             self.close_workspace(workspace)
         run_sublime('--project', workspace)
-        self.projects_info.refresh_projects()
+        self.projects_info.refresh_projects_async()
 
+    @profiler.profiled('Manager.open_in_new_window')
     @dont_close_windows_when_empty
     def open_in_new_window(self, project, workspace=None, close_project=True):
         if project is None:
             project = self.curr_pname
         if workspace is None:
             workspace = self.get_default_workspace(project)
+        self.projects_info.ensure_workspace(workspace)
         self.update_recent(project, workspace)
         if pm_settings.get("reopen_project_goto", True):
             if self.is_workspace_open(workspace):
@@ -1087,37 +1730,55 @@ class Manager:
                 self.close_project(project)
             run_sublime('-n', '--project', workspace)
 
-        self.projects_info.refresh_projects()
+        self.projects_info.refresh_projects_async()
 
     def _remove_project(self, project):
         if not sublime.ok_cancel_dialog('Remove "%s" from Project Manager?' % project):
             return
 
-        pfile = self.projects_info.info[project]["file"]
-        if self.projects_info.which_project_dir(pfile):
-            self.close_project(project)
-            os.remove(pfile)
-            if pfile in self.descriptions:
-                del self.descriptions[pfile]
+        self._remove_projects([project])
+        sublime.status_message('Project "%s" is removed.' % project)
 
-            for workspace in self.projects_info.info[project]['workspaces']:
-                os.remove(workspace)
-                if workspace in self.descriptions:
-                    del self.descriptions[workspace]
+    def _remove_projects(self, projects):
+        """Remove several projects at once
 
-            if not os.listdir(os.path.dirname(pfile)):
-                os.removedirs(os.path.dirname(pfile))
+        The files of the projects are removed, each `library.json` is saved once and
+        the projects are refreshed once.
 
-        else:
+        Args:
+            projects: list[str]
+                The names of the projects to remove
+        """
+        library_files = set()
+        for project in projects:
+            pfile = self.projects_info.info[project]["file"]
+            if self.projects_info.which_project_dir(pfile):
+                self.close_project(project)
+                if os.path.exists(pfile):
+                    os.remove(pfile)
+                if pfile in self.descriptions:
+                    del self.descriptions[pfile]
+
+                for workspace in self.projects_info.info[project]['workspaces']:
+                    if os.path.exists(workspace):
+                        os.remove(workspace)
+                    if workspace in self.descriptions:
+                        del self.descriptions[workspace]
+
+                if not os.listdir(os.path.dirname(pfile)):
+                    os.removedirs(os.path.dirname(pfile))
+
+            else:
+                library_files.add(pfile)
+
+        if library_files:
             for pdir in self.projects_info.projects_path():
                 j = JsonFile(os.path.join(pdir, 'library.json'))
                 data = j.load()
-                if pfile in data:
-                    data.remove(pfile)
-                    j.save(data)
+                new_data = [f for f in data if f not in library_files]
+                if len(new_data) != len(data):
+                    j.save(new_data)
 
-        JsonFile(self.desc_path).save(self.descriptions)
-        sublime.status_message('Project "%s" is removed.' % project)
         self.projects_info.refresh_projects()
 
     def remove_project(self, project):
@@ -1135,7 +1796,6 @@ class Manager:
         os.remove(wfile)
         if wfile in self.descriptions:
             del self.descriptions[wfile]
-            JsonFile(self.desc_path).save(self.descriptions)
 
         self.projects_info.refresh_projects()
         sublime.status_message('Workspace "%s" is removed.' % workspace)
@@ -1147,26 +1807,53 @@ class Manager:
     def remove_workspace(self, project, wfile):
         sublime.set_timeout(lambda: self._remove_workspace(project, wfile), 100)
 
+    def get_dead_projects(self):
+        """Get the projects whose folder doesn't exist anymore
+
+        As folders may be on slow or hung network mounts, they are checked by the
+        liveness checker, which gives up on a mount after `liveness_timeout` seconds.
+
+        Returns:
+            tuple[list[str], list[str]]: the names of the projects whose folder is
+                missing, and of those whose folder is on an unreachable mount, sorted
+        """
+        folders = {pname: pi['folder'] for pname, pi in self.projects_info.info.items()}
+        statuses = self.projects_info.liveness().check(folders.values())
+        missing = sorted(p for p, folder in folders.items() if statuses[folder] == MISSING)
+        unreachable = sorted(p for p, folder in folders.items()
+                             if statuses[folder] == UNREACHABLE)
+        return missing, unreachable
+
     def clean_dead_projects(self):
-        projects_to_remove = []
-        for pname, pi in self.projects_info.info.items():
-            folder = pi['folder']
-            if not os.path.exists(folder):
-                projects_to_remove.append(pname)
-
-        def remove_projects_iteratively():
-            pname = projects_to_remove[0]
-            self._remove_project(pname)
-            projects_to_remove.remove(pname)
-            if len(projects_to_remove) > 0:
-                sublime.set_timeout(remove_projects_iteratively, 100)
-            else:
-                self.projects_info.refresh_projects()
+        def check_projects():
+            projects_to_remove, unreachable = self.get_dead_projects()
+            sublime.set_timeout(lambda: confirm_removal(projects_to_remove, unreachable), 0)
+
+        def format_names(projects):
+            names = projects[:20]
+            if len(projects) > len(names):
+                names.append('... (%d more)' % (len(projects) - len(names)))
+            return '\n'.join(names)
+
+        def confirm_removal(projects_to_remove, unreachable):
+            note = ''
+            if unreachable:
+                note = ('\n\nThe folders of the following projects are unreachable, '
+                        'they are kept:\n\n' + format_names(unreachable))
+
+            if not projects_to_remove:
+                sublime.message_dialog('No Dead Projects.' + note)
+                return
 
-        if len(projects_to_remove) > 0:
-            sublime.set_timeout(remove_projects_iteratively, 100)
-        else:
-            sublime.message_dialog('No Dead Projects.')
+            message = 'Remove the following dead projects from Project Manager?\n\n'
+            if not sublime.ok_cancel_dialog(message + format_names(projects_to_remove) + note):
+                return
+
+            self._remove_projects(projects_to_remove)
+            sublime.status_message('%d dead projects removed.' % len(projects_to_remove))
+
+        # Don't block the UI while the folders are checked
+        sublime.set_timeout_async(check_projects, 0)
 
     def edit_project(self, project):
         def on_open():
@@ -1181,12 +1868,10 @@ class Manager:
             if not new_desc:
                 if file in self.descriptions:
                     del self.descriptions[file]
-                    JsonFile(self.desc_path).save(self.descriptions)
                     sublime.status_message("Description removed !")
                 return
 
             self.descriptions[file] = new_desc
-            JsonFile(self.desc_path).save(self.descriptions)
             sublime.status_message("Description updated !")
 
         if value is not None:
@@ -1232,6 +1917,8 @@ class Manager:
 
             pfile = os.path.realpath(self.projects_info.info[project]["file"])
             pdir = os.path.dirname(pfile)
+            recent_pfile = self.projects_info.info[project]["pretty_file"]
+            renamed_workspaces = {}
 
             new_pfile = os.path.join(pdir, '%s.sublime-project' % new_project)
             closed_workspaces = self.close_project(project)
@@ -1244,6 +1931,7 @@ class Manager:
                 del self.descriptions[pfile]
 
             for wfile in self.projects_info.info[project]['workspaces']:
+                self.projects_info.ensure_workspace(wfile)
                 if wfile.endswith(os.sep + '%s.sublime-workspace' % project):
                     new_wfile = re.sub(project + r'\.sublime-workspace$',
                                        new_project + '.sublime-workspace',
@@ -1263,6 +1951,7 @@ class Manager:
 
                 else:
                     new_wfile = wfile
+                renamed_workspaces[wfile] = os.path.basename(new_wfile)
 
                 if wfile in self.descriptions:
                     beg, mid, end = new_wfile.rpartition(os.sep + project + os.sep)
@@ -1275,12 +1964,8 @@ class Manager:
                     beg, mid, end = new_wfile.rpartition(os.sep + project + os.sep)
                     closed_workspaces[index] = beg + os.sep + new_project + os.sep + end
 
-                j = JsonFile(new_wfile)
-                data = j.load({})
-                data['project'] = '%s.sublime-project' % os.path.basename(new_project)
-                j.save(data)
-
-            JsonFile(self.desc_path).save(self.descriptions)
+                JsonFile(new_wfile).replace_key(
+                    'project', '%s.sublime-project' % os.path.basename(new_project))
 
             if self.projects_info.which_project_dir(pfile) is not None:
                 try:
@@ -1300,8 +1985,19 @@ class Manager:
                             data.append(new_pfile)
                             j.save(data)
 
+            self.windows.forget_paths()
             self.projects_info.refresh_projects()
 
+            # Keep the history of the project, whose directory may have been renamed too
+            new_pdir = os.path.dirname(self.projects_info.info[new_project]["file"])
+            workspaces = {}
+            for wfile, wname in renamed_workspaces.items():
+                workspaces[wfile] = os.path.join(new_pdir, wname)
+                workspaces[pretty_path(wfile)] = pretty_path(workspaces[wfile])
+            self.projects_info.recent().rename(
+                recent_pfile, self.projects_info.info[new_project]["pretty_file"],
+                workspaces)
+
             force_switch = (project == self.curr_pname)
             self.reopen_workspaces(new_project, closed_workspaces, force_switch=force_switch)
 
@@ -1344,8 +2040,11 @@ class Manager:
             if wfile in self.descriptions:
                 self.descriptions[new_wfile] = self.descriptions[wfile]
                 del self.descriptions[wfile]
-                JsonFile(self.desc_path).save(self.descriptions)
 
+            recent_pfile = self.projects_info.info[project]["pretty_file"]
+            self.projects_info.recent().rename(
+                recent_pfile, recent_pfile,
+                {wfile: new_wfile, pretty_path(wfile): pretty_path(new_wfile)})
             self.projects_info.refresh_projects()
 
             if wfile in closed_workspaces:
@@ -1380,6 +2079,11 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
             self.manager = Manager(self.window)
         self.manager.refresh_curr_project()
 
+        # Serve the current projects information right away, and check in the
+        # background whether it's still up-to-date
+        if self.manager.projects_info.is_loaded():
+            self.manager.projects_info.revalidate_async(on_done=self._on_projects_refreshed)
+
         # No action passed: show options in the quick panel
         if action is None:
             self.show_options()
@@ -1499,6 +2203,10 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
                                       on_cancel=self._on_cancel,
                                       add_project=add_project)
 
+    def _on_projects_refreshed(self, changed):
+        if changed:
+            sublime.status_message("Projects list updated")
+
     def _on_cancel(self):
         if self.caller == "manager":
             sublime.set_timeout(self.run, 100)
@@ -1603,7 +2311,8 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
         self.manager.import_sublime_project(on_cancel=self._on_cancel)
 
     def refresh_projects(self):
-        self.manager.projects_info.refresh_projects()
+        self.manager.projects_info.refresh_projects(full=True)
+        self.manager.projects_info.run_maintenance()
         sublime.status_message("Projects refreshed !")
 
     def clear_recent_projects(self):
@@ -1611,3 +2320,14 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
 
     def remove_dead_projects(self):
         self.manager.clean_dead_projects()
+
+    def show_performance_report(self):
+        if profiler.enabled:
+            report = profiler.report()
+        else:
+            report = ('Instrumentation is disabled: set "enable_instrumentation" to true '
+                      'in the settings of ProjectManager to record timings.\n')
+
+        panel = self.window.create_output_panel('project_manager_report')
+        panel.run_command('append', {'characters': report})
+        self.window.run_command('show_panel', {'panel': 'output.project_manager_report'})
@@ -0,0 +1,61 @@
+class ProjectRanking:
+    """Order the projects of the project quick panel
+
+    Projects are sorted in a single pass by:
+    - whether they are open in a window, if `active_first`
+    - their frecency score or their recency rank in the recent history, if
+      `recent_first`
+    - their name
+
+    The last ordering is reused as long as the projects, the recent history, the
+    open projects and the options stay the same.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._order = None
+
+    def order(self, info, recent, open_projects, recent_first=True, active_first=True,
+              by_frecency=True):
+        """Get the projects in the order in which to display them
+
+        Args:
+            info: dict
+                The projects information, as given by `ProjectsInfo.info`
+            recent: RecentStore
+                The recent history
+            open_projects: set[str]
+                The names of the projects open in a window
+            recent_first: bool
+                Whether to put the recent projects first
+            active_first: bool
+                Whether to put the open projects first
+            by_frecency: bool
+                Whether to rank the recent projects by frecency rather than by
+                recency
+
+        Returns:
+            list[str]: the names of the projects
+        """
+        # Reloading the history changes its version, which must be done before using
+        # the version in the key
+        recent.reload_if_changed()
+        key = (recent.version, frozenset(open_projects), recent_first, active_first,
+               by_frecency)
+        if self._order is not None and self._key[0] is info and self._key[1:] == key:
+            return self._order
+
+        scores = {}
+        if recent_first:
+            scores = recent.project_scores() if by_frecency else recent.project_ranks()
+        no_score = float('-inf')
+
+        def sort_key(item):
+            project, pinfo = item
+            return (active_first and project not in open_projects,
+                    -scores.get(pinfo['pretty_file'], no_score),
+                    project)
+
+        self._order = [project for project, _ in sorted(info.items(), key=sort_key)]
+        self._key = (info,) + key
+        return self._order
@@ -0,0 +1,313 @@
+import sublime
+
+import collections
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+
+from .json_file import JsonFile
+from .utils import file_signature
+
+
+# Half-life of a visit in the frecency scores
+HALF_LIFE = 7 * 24 * 3600
+
+# Age given to the older workspaces of the projects converted from `recent.json`,
+# for their visits to be negligible in the frecency of their project
+_LEGACY_VISITS_AGE = 64 * HALF_LIFE
+
+
+def _add_visit(score, timestamp):
+    """Add a visit to a frecency score
+
+    The frecency of an item is the sum of 2^((t - now) / HALF_LIFE) over its visits.
+    As `now` is common to every item, the score stored is log2 of the sum of
+    2^(t / HALF_LIFE), which can be compared across items without being updated
+    as time goes by, and doesn't overflow.
+
+    Args:
+        score: float
+            The current score, or None if the item was never visited
+        timestamp: float
+            The time of the visit
+
+    Returns:
+        float: the new score
+    """
+    visit = timestamp / HALF_LIFE
+    if score is None:
+        return visit
+    high, low = max(score, visit), min(score, visit)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+class RecentStore:
+    """Keep the history of the opened projects and workspaces in memory
+
+    The history is stored in `recent.jsonl`, an append-only log with one record
+    per opening. Records are appended in a single write, `flush_delay`
+    milliseconds after the first of them, and the log is rewritten with only the
+    last `depth` records once it holds twice as many. It's only read again when
+    it's modified by something else than this store.
+
+    From the records of the log are computed the projects and their workspaces
+    from the least to the most recently opened, and their frecency scores (see
+    `_add_visit`).
+    """
+
+    def __init__(self, fpath, depth=1000, flush_delay=1000):
+        self.fpath = fpath
+        self.legacy_fpath = os.path.join(os.path.dirname(fpath), 'recent.json')
+        self.depth = depth
+        self.flush_delay = flush_delay
+        # Incremented each time the ranks or the scores change
+        self.version = 0
+
+        self._records = []
+        self._nb_lines = 0
+        self._pending = []
+        self._recent = collections.OrderedDict()
+        self._scores = {}
+        self._ranks = None
+        self._signature = None
+        self._loaded = False
+        self._flush_scheduled = False
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        """Load the log if it has never been loaded or if it changed on disk"""
+        if self._pending:
+            return
+
+        signature = file_signature(self.fpath)
+        if self._loaded and signature == self._signature:
+            return
+
+        records = []
+        nb_lines = 0
+        if signature is not None:
+            with open(self.fpath, encoding='utf-8') as f:
+                for line in f:
+                    nb_lines += 1
+                    try:
+                        record = json.loads(line)
+                        records.append((record['project'], record['workspace'],
+                                        record['time']))
+                    except (ValueError, KeyError, TypeError):
+                        # e.g. a line truncated by a crash
+                        continue
+        elif not self._loaded and os.path.exists(self.legacy_fpath):
+            records.extend(self._load_legacy_file())
+
+        self._records = records
+        self._nb_lines = nb_lines
+        self._signature = signature
+        self._loaded = True
+        self._replay_records()
+
+        # Convert the legacy file
+        if records and signature is None:
+            self._compact()
+            JsonFile(self.legacy_fpath).remove()
+
+    def _load_legacy_file(self):
+        """Convert the content of `recent.json`, which only kept the order of the 50
+        most recent projects and of their workspaces, into records"""
+        projects = []
+        for pobject in JsonFile(self.legacy_fpath).load([]):
+            # Skip records of the format used before workspaces were supported
+            if isinstance(pobject, dict) and 'project' in pobject:
+                pfile = pobject['project']
+                wlist = pobject.get('workspaces') or [
+                    re.sub(r'\.sublime-project$', '.sublime-workspace', pfile)]
+                projects.append((pfile, wlist))
+
+        # The most recent project and workspace are last, so give increasing
+        # timestamps in that order. Only the last workspace of a project counts as a
+        # recent visit: the others are made old enough not to raise its score above
+        # the score of the projects opened after it
+        mtime = os.path.getmtime(self.legacy_fpath)
+        records = []
+        for i, (pfile, wlist) in enumerate(projects, 1):
+            timestamp = mtime - (len(projects) - i)
+            records.extend((pfile, wfile, timestamp - (len(wlist) - j) * _LEGACY_VISITS_AGE)
+                           for j, wfile in enumerate(wlist, 1))
+        return records
+
+    def _replay_records(self):
+        self._recent = collections.OrderedDict()
+        self._scores = {}
+        self._ranks = None
+        self.version += 1
+        for record in self._records:
+            self._add_record(*record)
+
+    def _add_record(self, pfile, wfile, timestamp):
+        workspaces = self._recent.pop(pfile, None)
+        if workspaces is None:
+            workspaces = collections.OrderedDict()
+        self._recent[pfile] = workspaces
+        workspaces[wfile] = _add_visit(workspaces.pop(wfile, None), timestamp)
+        self._scores[pfile] = _add_visit(self._scores.get(pfile), timestamp)
+        self._ranks = None
+        self.version += 1
+
+    def reload_if_changed(self):
+        """Read the log again if it changed on disk since it was last read or written,
+        and if there is no pending record"""
+        with self._lock:
+            self._ensure_loaded()
+
+    def project_ranks(self):
+        """Get the rank of the recent projects
+
+        The returned dict is shared and must not be modified.
+
+        Returns:
+            dict[str, int]: the rank of each project file (as given by `pretty_path`),
+                the higher the more recent
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if self._ranks is None:
+                self._ranks = {pfile: rank for rank, pfile in enumerate(self._recent)}
+            return self._ranks
+
+    def project_scores(self):
+        """Get the frecency score of the recent projects
+
+        The returned dict is shared and must not be modified.
+
+        Returns:
+            dict[str, float]: the score of each project file (as given by
+                `pretty_path`), the higher the more frequently and recently opened
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._scores
+
+    def workspaces(self, pfile):
+        """Get the recent workspaces of a project
+
+        Args:
+            pfile: str
+                The path of the project file, as given by `pretty_path`
+
+        Returns:
+            list[str]: the workspace files, from the least to the most recently opened
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._recent.get(pfile, ()))
+
+    def workspace_scores(self, pfile):
+        """Get the frecency score of the recent workspaces of a project
+
+        Args:
+            pfile: str
+                The path of the project file, as given by `pretty_path`
+
+        Returns:
+            dict[str, float]: the score of each workspace file
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._recent.get(pfile, ()))
+
+    def update(self, pfile, wfile):
+        """Record the opening of a project and one of its workspaces
+
+        Args:
+            pfile: str
+                The path of the project file, as given by `pretty_path`
+            wfile: str
+                The path of the workspace file
+        """
+        with self._lock:
+            self._ensure_loaded()
+            record = (pfile, wfile, time.time())
+            self._add_record(*record)
+            self._records.append(record)
+            self._pending.append(record)
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                sublime.set_timeout_async(self.flush, self.flush_delay)
+
+    def rename(self, old_pfile, new_pfile, workspaces):
+        """Update the history of a renamed project
+
+        Args:
+            old_pfile: str
+                The previous path of the project file, as given by `pretty_path`
+            new_pfile: str
+                The new path of the project file, as given by `pretty_path`
+            workspaces: dict[str, str]
+                The new path of the workspace files of the project
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if old_pfile not in self._recent:
+                return
+
+            self._records = [(new_pfile, workspaces.get(wfile, wfile), timestamp)
+                             if pfile == old_pfile else (pfile, wfile, timestamp)
+                             for pfile, wfile, timestamp in self._records]
+            # The pending records are written along with the others
+            self._pending = []
+            self._compact()
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._pending = []
+            self._recent.clear()
+            self._scores = {}
+            self._ranks = None
+            self.version += 1
+            self._nb_lines = 0
+            JsonFile(self.fpath).remove()
+            JsonFile(self.legacy_fpath).remove()
+            self._signature = None
+
+    def flush(self):
+        """Append the pending records to the log, compacting it if needed"""
+        with self._lock:
+            self._flush_scheduled = False
+            if not self._pending:
+                return
+
+            if self._nb_lines + len(self._pending) > 2 * self.depth:
+                self._compact()
+            else:
+                with open(self.fpath, mode='a', encoding='utf-8', newline='\n') as f:
+                    f.write(''.join(self._encode(record) for record in self._pending))
+                self._nb_lines += len(self._pending)
+                self._signature = file_signature(self.fpath)
+            self._pending = []
+
+    def _compact(self):
+        """Rewrite the log with only the last `depth` records"""
+        self._records = self._records[-self.depth:]
+        self._replay_records()
+
+        fdir = os.path.dirname(self.fpath)
+        fd, tmp_path = tempfile.mkstemp(dir=fdir, prefix='.recent', suffix='.tmp')
+        try:
+            with open(fd, mode='w', encoding='utf-8', newline='\n') as f:
+                f.write(''.join(self._encode(record) for record in self._records))
+            os.replace(tmp_path, self.fpath)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._nb_lines = len(self._records)
+        self._signature = file_signature(self.fpath)
+
+    @staticmethod
+    def _encode(record):
+        pfile, wfile, timestamp = record
+        return json.dumps({'project': pfile, 'workspace': wfile, 'time': timestamp},
+                          ensure_ascii=False, separators=(',', ':')) + '\n'
@@ -0,0 +1,213 @@
+from ProjectManager.json_file import JsonFile, _JsonScanner, _load_cache
+from ProjectManager.utils import file_signature
+
+
+import io
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+
+WORKSPACE = {
+    "buffers": [
+        {"file": "/path/to/a.py", "settings": {"buffer_size": 12}},
+        {"contents": "unsaved \"text\" {with} [brackets]\n", "settings": {}},
+        {"file": "/path/to/café \U0001f600.py", "settings": {"file": "nested"}},
+    ],
+    "groups": [{"sheets": [{"buffer": 0, "settings": {"selection": [[0, 0]]}}]}],
+    "settings": {"project": "nested.sublime-project"},
+    "project": "test.sublime-project",
+    "select_file": {"height": 0.0, "selected_items": []},
+}
+
+
+class TestJsonScanner(unittest.TestCase):
+    def scan(self, content, chunk_size=65536):
+        return _JsonScanner(io.StringIO(content, newline=''), chunk_size=chunk_size)
+
+    def test_chunk_boundaries(self):
+        content = json.dumps(WORKSPACE, indent='\t')
+        # Every chunk size splits some tokens (strings, literals, escapes) in two
+        for chunk_size in range(1, 40):
+            scanner = self.scan(content, chunk_size)
+            self.assertTrue(scanner.find_key("project"))
+            self.assertEqual(scanner.next(), '"')
+            self.assertEqual(scanner.value, "test.sublime-project")
+
+            scanner = self.scan(content, chunk_size)
+            self.assertTrue(scanner.find_key("buffers"))
+            self.assertEqual(scanner.next(), '[')
+            self.assertEqual(scanner.read_array_field("file"),
+                             ["/path/to/a.py", "/path/to/café \U0001f600.py"])
+
+    def test_escapes_and_surrogate_pairs(self):
+        content = '{"a": "\\"}\\\\", "b": "\\ud83d\\ude00 \\u00e9\\n", "c": "\U0001f600"}'
+        for chunk_size in (1, 3, 65536):
+            scanner = self.scan(content, chunk_size)
+            self.assertTrue(scanner.find_key("b"))
+            self.assertEqual(scanner.next(), '"')
+            self.assertEqual(scanner.value, "\U0001f600 é\n")
+
+            scanner = self.scan(content, chunk_size)
+            self.assertTrue(scanner.find_key("c"))
+            scanner.next()
+            self.assertEqual(scanner.value, "\U0001f600")
+
+    def test_crlf(self):
+        content = json.dumps(WORKSPACE, indent='\t').replace('\n', '\r\n')
+        scanner = self.scan(content, 7)
+        self.assertTrue(scanner.find_key("project"))
+        scanner.next()
+        self.assertEqual(scanner.value, "test.sublime-project")
+
+    def test_missing_key(self):
+        scanner = self.scan(json.dumps(WORKSPACE))
+        self.assertFalse(scanner.find_key("missing"))
+
+    def test_nested_key_is_skipped(self):
+        # "file" and "project" only appear at depth > 0 before the top-level key
+        content = json.dumps({"settings": {"project": "nested", "file": "nested"},
+                              "project": "top"})
+        scanner = self.scan(content, 5)
+        self.assertTrue(scanner.find_key("project"))
+        scanner.next()
+        self.assertEqual(scanner.value, "top")
+
+        scanner = self.scan(content)
+        self.assertFalse(scanner.find_key("file"))
+
+    def test_value_span(self):
+        content = '{\r\n\t"a": [1, {"b": "]"}],\r\n\t"project": "x"\r\n}'
+        for chunk_size in (1, 4, 65536):
+            scanner = self.scan(content, chunk_size)
+            self.assertTrue(scanner.find_key("a"))
+            start, end = scanner.value_span()
+            self.assertEqual(content[start:end], '[1, {"b": "]"}]')
+
+    def test_give_up_when_dense(self):
+        dense = json.dumps({"undo": [[i, [[i, i]]] for i in range(200000)],
+                            "project": "x"})
+        with self.assertRaises(ValueError):
+            _JsonScanner(io.StringIO(dense), give_up_when_dense=True).find_key("project")
+        self.assertTrue(self.scan(dense).find_key("project"))
+
+        sparse = json.dumps({"contents": ["a" * 1000] * 2000, "project": "x"})
+        scanner = _JsonScanner(io.StringIO(sparse), give_up_when_dense=True)
+        self.assertTrue(scanner.find_key("project"))
+
+    def test_invalid_json(self):
+        for content in ('{"a": 1,, "project": "x"}', '{"a": [1, 2', '["project"]',
+                        '{"a": 1 // comment\n, "project": "x"}', ''):
+            with self.assertRaises(ValueError):
+                self.scan(content).find_key("project")
+
+
+class TestJsonFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.wfile = os.path.join(self.temp_dir, 'test.sublime-workspace')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, content):
+        with open(self.wfile, mode='w', encoding='utf-8', newline='') as f:
+            f.write(content)
+
+    def read(self):
+        with open(self.wfile, mode='r', encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def test_load_key(self):
+        self.write(json.dumps(WORKSPACE, indent='\t'))
+        self.assertEqual(JsonFile(self.wfile).load_key("project"), "test.sublime-project")
+        self.assertEqual(JsonFile(self.wfile).load_key("missing", "default"), "default")
+        # Non scalar values are read by a full decode
+        self.assertEqual(JsonFile(self.wfile).load_key("select_file"),
+                         WORKSPACE["select_file"])
+
+    def test_load_key_missing_file(self):
+        self.assertEqual(JsonFile(self.wfile).load_key("project", "default"), "default")
+        self.assertFalse(os.path.exists(self.wfile))
+
+    def test_load_array_field(self):
+        self.write(json.dumps(WORKSPACE, indent='\t').replace('\n', '\r\n'))
+        self.assertEqual(JsonFile(self.wfile).load_array_field("buffers", "file"),
+                         ["/path/to/a.py", "/path/to/café \U0001f600.py"])
+        self.assertEqual(JsonFile(self.wfile).load_array_field("groups", "file"), [])
+        self.assertEqual(JsonFile(self.wfile).load_array_field("missing", "file"), [])
+
+    def test_fallback_to_full_decode(self):
+        # Comments and trailing commas are only supported by the full decode
+        self.write('{\n\t// comment\n\t"buffers": [{"file": "a.py",},],\n'
+                   '\t"project": "test.sublime-project",\n}')
+        self.assertEqual(JsonFile(self.wfile).load_key("project"), "test.sublime-project")
+        self.assertEqual(JsonFile(self.wfile).load_array_field("buffers", "file"), ["a.py"])
+
+    def test_large_fallback_is_not_cached(self):
+        # The comment makes the scan fail
+        self.write('{\n\t// comment\n\t"buffers": [{"file": "a.py"}],\n\t"contents": "%s",\n'
+                   '\t"project": "test.sublime-project"\n}' % ("a" * (2 << 20)))
+        self.assertEqual(JsonFile(self.wfile).load_key("project"), "test.sublime-project")
+        self.assertEqual(JsonFile(self.wfile).load_array_field("buffers", "file"), ["a.py"])
+        self.assertIsNone(_load_cache.get(self.wfile, file_signature(self.wfile)))
+
+    def test_large_dense_file_is_scanned(self):
+        self.write(json.dumps({"buffers": [{"file": "a.py"}],
+                               "history": [[i, [[i, i]]] for i in range(200000)],
+                               "project": "test.sublime-project"}))
+        # Small dense files are decoded as a whole, large ones are always scanned
+        with patch("ProjectManager.json_file._DENSE_DECODE_MAX", 1 << 20), \
+                patch.object(JsonFile, "load", side_effect=AssertionError):
+            self.assertEqual(JsonFile(self.wfile).load_key("project"),
+                             "test.sublime-project")
+        with patch("ProjectManager.json_file._DENSE_DECODE_MAX", 64 << 20), \
+                patch.object(JsonFile, "load", return_value={"project": "decoded"}):
+            self.assertEqual(JsonFile(self.wfile).load_key("project"), "decoded")
+
+    def test_truncated_file(self):
+        content = json.dumps(WORKSPACE)
+        self.write(content[:content.index('"project"') + 5])
+        with patch("sublime.message_dialog") as dialog, self.assertRaises(ValueError):
+            JsonFile(self.wfile).load_key("project")
+        self.assertTrue(dialog.called)
+
+    def test_replace_key_only_changes_the_value(self):
+        content = json.dumps(WORKSPACE, indent='\t', ensure_ascii=False).replace('\n', '\r\n')
+        self.write(content)
+        JsonFile(self.wfile).replace_key("project", "renamed é.sublime-project")
+        self.assertEqual(self.read(), content.replace(
+            '"project": "test.sublime-project"', '"project": "renamed é.sublime-project"'))
+        self.assertEqual(os.listdir(self.temp_dir), ['test.sublime-workspace'])
+
+    def test_replace_key_missing_key(self):
+        self.write(json.dumps({"buffers": []}))
+        JsonFile(self.wfile).replace_key("project", "test.sublime-project")
+        self.assertEqual(JsonFile(self.wfile).load(),
+                         {"buffers": [], "project": "test.sublime-project"})
+
+    @unittest.skipIf(sys.platform == 'win32', "file modes aren't supported on Windows")
+    def test_replace_key_preserves_mode(self):
+        self.write(json.dumps(WORKSPACE))
+        os.chmod(self.wfile, 0o600)
+        JsonFile(self.wfile).replace_key("project", "renamed.sublime-project")
+        self.assertEqual(stat.S_IMODE(os.stat(self.wfile).st_mode), 0o600)
+
+        JsonFile(self.wfile).save(WORKSPACE)
+        self.assertEqual(stat.S_IMODE(os.stat(self.wfile).st_mode), 0o600)
+
+    @unittest.skipIf(sys.platform == 'win32', "file modes aren't supported on Windows")
+    def test_new_file_follows_umask(self):
+        umask = os.umask(0o027)
+        try:
+            self.assertEqual(JsonFile(self.wfile).load({"a": 1}), {"a": 1})
+        finally:
+            os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(self.wfile).st_mode), 0o640)
+        self.assertEqual(os.listdir(self.temp_dir), ['test.sublime-workspace'])
+        self.assertEqual(JsonFile(self.wfile).load(), {"a": 1})
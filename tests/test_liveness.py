@@ -0,0 +1,57 @@
+from ProjectManager import liveness
+from ProjectManager.liveness import ALIVE, MISSING, UNREACHABLE, LivenessChecker
+
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+
+class TestLivenessChecker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.alive = os.path.join(self.temp_dir, 'alive')
+        self.missing = os.path.join(self.temp_dir, 'missing')
+        os.mkdir(self.alive)
+
+        # Stats on the hung mount block until the end of the test
+        self.release = threading.Event()
+        self.stats = []
+        stat_status = liveness._stat_status
+
+        def hanging_stat_status(path):
+            self.stats.append(path)
+            if path.startswith('/hung/'):
+                self.release.wait()
+            return stat_status(path)
+
+        patcher = patch('ProjectManager.liveness._stat_status', hanging_stat_status)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.checker = LivenessChecker(timeout=0.2, ttl=60, workers=2)
+        self.checker.mount_point = lambda path: '/hung' if path.startswith('/hung/') else '/'
+
+    def tearDown(self):
+        self.release.set()
+        shutil.rmtree(self.temp_dir)
+
+    def test_hung_mount(self):
+        paths = ['/hung/a', self.alive, '/hung/b', self.missing, '/hung/c']
+        start = time.monotonic()
+        results = self.checker.check(paths)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(results, {'/hung/a': UNREACHABLE, '/hung/b': UNREACHABLE,
+                                   '/hung/c': UNREACHABLE, self.alive: ALIVE,
+                                   self.missing: MISSING})
+
+        # Within the ttl, only the missing path is checked again
+        del self.stats[:]
+        start = time.monotonic()
+        self.assertEqual(self.checker.check(paths), results)
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertEqual(self.stats, [self.missing])
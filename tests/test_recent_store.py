@@ -0,0 +1,129 @@
+from ProjectManager.recent_store import RecentStore
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestRecentStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.temp_dir, 'recent.jsonl')
+        self.legacy_fpath = os.path.join(self.temp_dir, 'recent.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_records(self):
+        with open(self.fpath, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_convert_legacy_file(self):
+        with open(self.legacy_fpath, 'w', encoding='utf-8') as f:
+            json.dump([
+                "~/old/format.sublime-project",
+                {"project": "~/a.sublime-project",
+                 "workspaces": ["~/a.sublime-workspace", "~/a2.sublime-workspace"]},
+                {"project": "~/b.sublime-project"},
+            ], f)
+
+        store = RecentStore(self.fpath)
+        self.assertEqual(store.project_ranks(),
+                         {"~/a.sublime-project": 0, "~/b.sublime-project": 1})
+        self.assertEqual(store.workspaces("~/a.sublime-project"),
+                         ["~/a.sublime-workspace", "~/a2.sublime-workspace"])
+        # Projects without workspaces get their default one
+        self.assertEqual(store.workspaces("~/b.sublime-project"),
+                         ["~/b.sublime-workspace"])
+        # The frecency keeps the order of the legacy file
+        scores = store.project_scores()
+        self.assertGreater(scores["~/b.sublime-project"], scores["~/a.sublime-project"])
+        scores = store.workspace_scores("~/a.sublime-project")
+        self.assertGreater(scores["~/a2.sublime-workspace"], scores["~/a.sublime-workspace"])
+
+        self.assertFalse(os.path.exists(self.legacy_fpath))
+        self.assertEqual([record["workspace"] for record in self.read_records()],
+                         ["~/a.sublime-workspace", "~/a2.sublime-workspace",
+                          "~/b.sublime-workspace"])
+
+        # The conversion is only done once
+        self.assertEqual(RecentStore(self.fpath).project_ranks(), store.project_ranks())
+
+    def test_compact_past_depth(self):
+        store = RecentStore(self.fpath, depth=3)
+        for i in range(10):
+            store.update("~/p%d.sublime-project" % (i % 4), "~/w%d.sublime-workspace" % i)
+            store.flush()
+            self.assertLessEqual(len(self.read_records()), 2 * store.depth)
+
+        # The last compaction kept the last 3 records, then 3 were appended
+        records = self.read_records()
+        self.assertEqual(len(records), 6)
+        self.assertEqual([record["workspace"] for record in records],
+                         ["~/w%d.sublime-workspace" % i for i in range(4, 10)])
+
+        # Reloading the log gives what was computed in memory
+        reloaded = RecentStore(self.fpath, depth=3)
+        self.assertEqual(reloaded.project_ranks(), store.project_ranks())
+        self.assertEqual(reloaded.project_scores(), store.project_scores())
+        self.assertEqual(reloaded.workspaces("~/p1.sublime-project"),
+                         store.workspaces("~/p1.sublime-project"))
+
+    def test_most_recent_first(self):
+        store = RecentStore(self.fpath)
+        store.update("~/a.sublime-project", "~/a.sublime-workspace")
+        store.update("~/b.sublime-project", "~/b.sublime-workspace")
+        store.update("~/a.sublime-project", "~/a2.sublime-workspace")
+        store.flush()
+
+        ranks = store.project_ranks()
+        self.assertGreater(ranks["~/a.sublime-project"], ranks["~/b.sublime-project"])
+        self.assertEqual(store.workspaces("~/a.sublime-project"),
+                         ["~/a.sublime-workspace", "~/a2.sublime-workspace"])
+        scores = store.project_scores()
+        self.assertGreater(scores["~/a.sublime-project"], scores["~/b.sublime-project"])
+
+    def test_reload_when_modified_elsewhere(self):
+        store = RecentStore(self.fpath)
+        other = RecentStore(self.fpath)
+        self.assertEqual(store.project_ranks(), {})
+
+        other.update("~/a.sublime-project", "~/a.sublime-workspace")
+        other.flush()
+        version = store.version
+        store.reload_if_changed()
+        self.assertGreater(store.version, version)
+        self.assertEqual(store.project_ranks(), {"~/a.sublime-project": 0})
+
+    def test_skip_truncated_records(self):
+        store = RecentStore(self.fpath)
+        store.update("~/a.sublime-project", "~/a.sublime-workspace")
+        store.flush()
+        with open(self.fpath, 'a', encoding='utf-8') as f:
+            f.write('{"project": "~/b.sublime-pro')
+
+        self.assertEqual(RecentStore(self.fpath).project_ranks(), {"~/a.sublime-project": 0})
+
+    def test_rename(self):
+        store = RecentStore(self.fpath)
+        store.update("~/a/a.sublime-project", "~/a/a.sublime-workspace")
+        store.update("~/b.sublime-project", "~/b.sublime-workspace")
+        store.rename("~/a/a.sublime-project", "~/c/c.sublime-project",
+                     {"~/a/a.sublime-workspace": "~/c/c.sublime-workspace"})
+
+        reloaded = RecentStore(self.fpath)
+        self.assertEqual(reloaded.project_ranks(),
+                         {"~/c/c.sublime-project": 0, "~/b.sublime-project": 1})
+        self.assertEqual(reloaded.workspaces("~/c/c.sublime-project"),
+                         ["~/c/c.sublime-workspace"])
+
+    def test_clear(self):
+        store = RecentStore(self.fpath)
+        store.update("~/a.sublime-project", "~/a.sublime-workspace")
+        store.flush()
+        store.clear()
+        self.assertEqual(store.project_ranks(), {})
+        self.assertFalse(os.path.exists(self.fpath))
@@ -0,0 +1,50 @@
+from ProjectManager.watcher import InotifyWatcher
+
+
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "inotify is only available on Linux")
+class TestInotifyWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.changes = queue.Queue()
+        self.watcher = InotifyWatcher(self.changes.put, delay=0.1)
+
+    def tearDown(self):
+        self.watcher.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_new_project_in_new_group(self):
+        group = os.path.join(self.temp_dir, 'group')
+        self.watcher.start()
+        self.assertTrue(self.watcher.watch([self.temp_dir]))
+
+        os.mkdir(group)
+        self.assertEqual(self.changes.get(timeout=5), {self.temp_dir})
+        # The refresh that follows watches the new directory
+        self.assertTrue(self.watcher.watch([self.temp_dir, group]))
+
+        with open(os.path.join(group, 'test.sublime-project'), 'w') as f:
+            f.write('{}')
+        self.assertEqual(self.changes.get(timeout=5), {group})
+
+    def test_network_fs_is_unreliable(self):
+        local = os.path.join(self.temp_dir, 'local')
+        remote = os.path.join(self.temp_dir, 'remote')
+        os.mkdir(local)
+        os.mkdir(remote)
+        mounts = [('/', 'ext4'), (remote, 'nfs4'), (os.path.join(remote, 'sub'), 'ext4')]
+
+        with patch('ProjectManager.watcher.read_mounts', return_value=mounts):
+            self.assertTrue(self.watcher.watch([local]))
+            self.assertTrue(self.watcher.watch([local, os.path.join(remote, 'sub', 'a')]))
+            self.assertFalse(self.watcher.watch([local, remote]))
+            # The paths are watched anyway, for the local changes
+            self.assertEqual(set(self.watcher._paths), {local, remote})
@@ -1,24 +1,96 @@
 import sublime
 import sublime_plugin
 
+import json
 import os
 import platform
+import plistlib
 import subprocess
 
 
+# Where macOS stores the computer name set in the Sharing preferences
+MACOS_PREFERENCES = '/Library/Preferences/SystemConfiguration/preferences.plist'
+
 computer_name = None
+computer_name_key = None
 
 
 def get_computer_name():
-    global computer_name
+    """Get the name of the computer
+
+    The name is only computed again when `computer_name_key` changes, and is kept
+    in memory. On macOS, it's read from the system preferences rather than by
+    running `scutil`, which is only done if they can't be read, and it's also kept
+    in the cache directory of Sublime Text, so that it survives plugin reloads and
+    restarts. Elsewhere, it's the network name, which is cheap to get.
+    """
+    global computer_name, computer_name_key
+
+    key = get_computer_name_key()
+    if computer_name and key == computer_name_key:
+        return computer_name
+    if sublime.platform() != 'osx':
+        computer_name, computer_name_key = _read_computer_name(), key
+        return computer_name
+
+    cache_file = os.path.join(sublime.cache_path(), 'ProjectManager', 'computer_name.json')
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['key'] == key and cached['name']:
+            computer_name, computer_name_key = cached['name'], key
+            return computer_name
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    computer_name, computer_name_key = _read_computer_name(), key
+    # Imported here as json_file depends on this module
+    from .json_file import JsonFile
+    try:
+        JsonFile(cache_file, compact=True).save({'name': computer_name, 'key': key})
+    except OSError:
+        pass
+    return computer_name
 
-    if not computer_name:
-        if sublime.platform() == 'osx':
-            computer_name = subprocess.check_output(['scutil', '--get', 'ComputerName']).decode().strip()
-        else:
-            computer_name = platform.node().split('.')[0]
 
-    return computer_name
+def get_computer_name_key():
+    """Get what the computer name is computed from, which must change when it does
+
+    Returns:
+        list: the network name of the computer and, on macOS, the signature of the
+            system preferences (as a list, to be compared with the key stored in
+            JSON)
+    """
+    key = [platform.node()]
+    if sublime.platform() == 'osx':
+        signature = file_signature(MACOS_PREFERENCES)
+        key.append(list(signature) if signature is not None else None)
+    return key
+
+
+def _read_computer_name():
+    if sublime.platform() != 'osx':
+        return platform.node().split('.')[0]
+
+    try:
+        with open(MACOS_PREFERENCES, mode='rb') as f:
+            name = plistlib.load(f)['System']['System']['ComputerName']
+        if name:
+            return name
+    except Exception:
+        pass
+    return subprocess.check_output(['scutil', '--get', 'ComputerName']).decode().strip()
+
+
+def file_signature(path):
+    """Return a (mtime, size, inode) tuple identifying the current state of a file,
+    or None if it can't be accessed"""
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
 
 
 def pretty_path(path):
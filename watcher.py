@@ -0,0 +1,267 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+from .liveness import read_mounts
+
+
+# File systems on which the changes made by other computers generate no event
+NETWORK_FS_TYPES = {
+    '9p', 'afs', 'ceph', 'cifs', 'coda', 'davfs', 'gfs2', 'glusterfs', 'gpfs', 'lustre',
+    'ncpfs', 'nfs', 'nfs4', 'ocfs2', 'smb3', 'smbfs', 'fuse.glusterfs', 'fuse.rclone',
+    'fuse.s3fs', 'fuse.sshfs',
+}
+
+
+def _any_on_network_fs(paths):
+    """Whether some paths are on network file systems, according to /proc/self/mounts"""
+    # Longest first, so that a path gets the file system of its deepest mount
+    mounts = sorted(read_mounts(), key=lambda mount: len(mount[0]), reverse=True)
+    if not any(fstype in NETWORK_FS_TYPES for _, fstype in mounts):
+        return False
+
+    for path in paths:
+        for mount, fstype in mounts:
+            if path == mount or path.startswith(mount.rstrip('/') + '/'):
+                if fstype in NETWORK_FS_TYPES:
+                    return True
+                break
+    return False
+
+
+def create_watcher(callback, poll_interval=5):
+    """Create the best watcher available on this platform
+
+    Args:
+        callback: callable
+            Called from the watcher thread with the set of directories in which
+            something changed, or None if the changes couldn't be tracked
+        poll_interval: float
+            Number of seconds between two checks when falling back to polling
+
+    Returns:
+        an InotifyWatcher on Linux, a PollingWatcher elsewhere
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(callback)
+        except OSError:
+            pass
+    return PollingWatcher(callback, poll_interval)
+
+
+class PollingWatcher:
+    """Watch paths by comparing their modification times at regular intervals
+
+    As modifying a file doesn't change the modification time of its directory, this
+    watcher only notices files being added, removed or renamed in watched
+    directories, and the modifications of the files that are watched explicitly.
+    """
+
+    # Modifications of files inside watched directories are missed
+    reliable = False
+
+    def __init__(self, callback, interval=5):
+        self.callback = callback
+        self.interval = interval
+        self._mtimes = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='ProjectManager watcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def watch(self, paths):
+        """Set the paths (files or directories) to watch
+
+        Returns:
+            bool: whether every path is watched
+        """
+        with self._lock:
+            self._mtimes = {path: self._mtimes.get(path, self._get_mtime(path))
+                            for path in paths}
+        return True
+
+    def _get_mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            changed = set()
+            with self._lock:
+                paths = list(self._mtimes.items())
+            for path, mtime in paths:
+                new_mtime = self._get_mtime(path)
+                if new_mtime != mtime:
+                    with self._lock:
+                        if path in self._mtimes:
+                            self._mtimes[path] = new_mtime
+                    changed.add(path if os.path.isdir(path) else os.path.dirname(path))
+
+            if changed:
+                self.callback(changed)
+
+
+class InotifyWatcher:
+    """Watch paths with the inotify API of the Linux kernel
+
+    Events are gathered until none is received for `delay` seconds, and then
+    reported all at once.
+    """
+
+    reliable = True
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, callback, delay=0.5):
+        self.callback = callback
+        self.delay = delay
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self._watches = {}
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        # Set once the watcher is stopped, after which the file descriptor is (or is
+        # about to be) closed and must not be used anymore
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='ProjectManager watcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            self._stopped = True
+            # Otherwise the thread closes it
+            if self._thread is None:
+                os.close(self._fd)
+
+    def watch(self, paths):
+        """Set the paths (files or directories) to watch
+
+        Returns:
+            bool: whether every path is watched (the number of watches can be
+                limited by the system), and is on a local file system
+        """
+        paths = set(paths)
+        success = True
+        with self._lock:
+            # Stopped by another thread, e.g. the settings changed during a refresh
+            if self._stopped:
+                return False
+
+            for path in set(self._paths) - paths:
+                self._libc.inotify_rm_watch(self._fd, self._paths.pop(path))
+
+            for path in paths - set(self._paths):
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.MASK)
+                if wd < 0:
+                    # Missing paths show up as events in the watched directories
+                    if ctypes.get_errno() != errno.ENOENT:
+                        success = False
+                    continue
+                self._paths[path] = wd
+                self._watches[wd] = path
+        return success and not _any_on_network_fs(paths)
+
+    def _read_events(self):
+        """Read the pending events
+
+        Returns:
+            set: the directories in which something changed, or None if some
+                events were lost
+        """
+        changed = set()
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size + length
+
+            if mask & self.IN_Q_OVERFLOW:
+                return None
+
+            with self._lock:
+                if mask & self.IN_IGNORED:
+                    path = self._watches.pop(wd, None)
+                    if path is not None and self._paths.get(path) == wd:
+                        del self._paths[path]
+                    continue
+                path = self._watches.get(wd)
+
+            if path is None:
+                continue
+            # Events on a watched file are reported on its directory, as are
+            # events on a watched directory itself being removed or moved
+            if length == 0 and (not os.path.isdir(path)
+                                or mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF)):
+                path = os.path.dirname(path)
+            changed.add(path)
+        return changed
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 1)
+                if not ready:
+                    continue
+
+                # Gather events until things calm down
+                changed = set()
+                while ready and changed is not None:
+                    events = self._read_events()
+                    changed = None if events is None else changed | events
+                    ready, _, _ = select.select([self._fd], [], [], self.delay)
+
+                if changed is None or changed:
+                    self.callback(changed)
+        finally:
+            with self._lock:
+                self._stopped = True
+                os.close(self._fd)
@@ -0,0 +1,117 @@
+import sublime
+
+import os
+
+
+class WindowRegistry:
+    """Keep track of the project and workspace files open in each window
+
+    The registry is updated by the `WindowRegistryListener` hooks, so that
+    checking whether a project or a workspace is open doesn't require to go through
+    every window and to resolve the path of their files. These hooks only exist
+    since Sublime Text 4050: before, the registry must be synced with the windows
+    by calling `sync` before using it.
+
+    Paths are compared once resolved by `os.path.realpath`, whose result is cached
+    for at most `MAX_REALPATHS` paths, and must be forgotten with `forget_paths` when
+    files are moved.
+    """
+
+    MAX_REALPATHS = 4096
+
+    _instance = None
+
+    def __init__(self):
+        self.event_driven = sublime.version() >= '4050'
+        self._realpaths = {}
+        self._windows = {}
+        self._files = {}
+        self._project_windows = {}
+        self._workspace_windows = {}
+        self.resync()
+
+    @classmethod
+    def get_instance(cls):
+        if not cls._instance:
+            cls._instance = cls()
+        return cls._instance
+
+    def canonical(self, path):
+        """Resolve a path, caching the result"""
+        realpath = self._realpaths.get(path)
+        if realpath is None:
+            if len(self._realpaths) >= self.MAX_REALPATHS:
+                self._realpaths.clear()
+            realpath = self._realpaths[path] = os.path.realpath(path)
+        return realpath
+
+    def forget_paths(self):
+        """Drop the cached resolved paths, e.g. once files or directories moved"""
+        self._realpaths.clear()
+
+    def resync(self):
+        """Rebuild the registry from the current windows"""
+        self._windows = {}
+        self._files = {}
+        self._project_windows = {}
+        self._workspace_windows = {}
+        for window in sublime.windows():
+            self.update(window)
+
+    def update(self, window):
+        """Register the files currently open in a window"""
+        self._unlink(window.id())
+
+        pfile = window.project_file_name()
+        wfile = None
+        if sublime.version() >= '4050':
+            wfile = window.workspace_file_name()
+        pfile = self.canonical(pfile) if pfile else None
+        wfile = self.canonical(wfile) if wfile else None
+
+        self._windows[window.id()] = window
+        self._files[window.id()] = (pfile, wfile)
+        if pfile is not None:
+            self._project_windows.setdefault(pfile, set()).add(window.id())
+        if wfile is not None:
+            self._workspace_windows.setdefault(wfile, set()).add(window.id())
+
+    def remove(self, window):
+        """Unregister a window"""
+        self._unlink(window.id())
+        self._windows.pop(window.id(), None)
+
+    def _unlink(self, window_id):
+        pfile, wfile = self._files.pop(window_id, (None, None))
+        for path, windows in ((pfile, self._project_windows),
+                              (wfile, self._workspace_windows)):
+            if path is not None:
+                windows[path].discard(window_id)
+                if not windows[path]:
+                    del windows[path]
+
+    def sync(self):
+        """Rebuild the registry if it isn't kept up-to-date by the hooks"""
+        if not self.event_driven:
+            self.resync()
+
+    def is_project_open(self, pfile):
+        return self.canonical(pfile) in self._project_windows
+
+    def is_workspace_open(self, wfile):
+        return self.canonical(wfile) in self._workspace_windows
+
+    def project_windows(self, pfile):
+        """Get the windows in which a project is open, in the order in which they
+        were opened"""
+        window_ids = self._project_windows.get(self.canonical(pfile), ())
+        return [window for window_id, window in self._windows.items()
+                if window_id in window_ids]
+
+    def workspace_windows(self, wfile):
+        """Get the windows in which a workspace is open, in the order in which they
+        were opened"""
+        window_ids = self._workspace_windows.get(self.canonical(wfile), ())
+        return [window for window_id, window in self._windows.items()
+                if window_id in window_ids]
+